@@ -1,100 +1,124 @@
-import sys
 import os
-import json
+import sys
+import time
 import asyncio
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QListWidget,
-    QListWidgetItem, QLineEdit, QLabel, QFileDialog, QMessageBox, QInputDialog
+    QListWidgetItem, QListView, QLineEdit, QLabel, QFileDialog, QMessageBox, QInputDialog,
+    QAbstractItemView, QDialog, QDialogButtonBox, QTextEdit, QRadioButton, QProgressBar
 )
-from PySide6.QtCore import Qt, QTimer
-from qasync import QEventLoop, asyncSlot
-from dotenv import load_dotenv
+from PySide6.QtCore import Qt, QTimer, QSize, QUrl
+from PySide6.QtGui import QDesktopServices
+from qasync import QEventLoop
 
 from aiogram import Bot, Dispatcher, types
 from aiogram import F
-from aiogram.types import FSInputFile
-
-# --- Configuration ---
-load_dotenv()
-API_TOKEN = os.getenv("API_TOKEN")
 
-CHAT_DIR = "Chats"
-os.makedirs(CHAT_DIR, exist_ok=True)
-CONTACTS_FILE = "contacts.json"
+from src.config import API_TOKEN, SEARCH_DELAY, THUMB_SIZE, RUN_MODE
+from src.store import HistoryStore, preview
+from src.chat_model import ChatModel, MessageIdRole, FileRole, StateRole
+from src.uploads import Uploader
+from src.broadcast import Broadcaster, RateLimiter
+from src.media import MediaCache, incoming_file
+from src.outbox import Outbox
+from src import webhook
 
 class TelegramBotRunner:
-    def __init__(self):
+    def __init__(self, store: HistoryStore):
         self.bot = Bot(token=API_TOKEN)
         self.dp = Dispatcher()
         self.dp.message.register(self.handle_message, F.chat.type == "private")
+        self.store = store
+        self.limiter = RateLimiter()
+        self.uploader = Uploader(self.bot, store, self.limiter)
+        self.broadcaster = Broadcaster(self.bot, store, self.uploader, self.limiter)
+        self.media = MediaCache(self.bot, store)
+        self.outbox = Outbox(self.bot, store, self.limiter)
         self.new_message_callback = None
+        self.task = None
+        self.stopping = asyncio.Event()
 
     async def handle_message(self, message: types.Message):
-        contact_id = message.chat.id
-        text = message.text or ""
-        media_type = "photo" if message.photo else None
-
+        text = message.text or message.caption or ""
+        file = incoming_file(message)
+        self.save_message(message.chat.id, False, text, file["kind"] if file else None, message.message_id, file)
+        if file:
+            # Fetched right away so it is on disk by the time it is opened; the download pool bounds the load
+            asyncio.create_task(self.media.fetch(file["file_id"], file["uid"], file["size"]))
+
+    def save_message(self, contact_id, from_me, text, media_type, message_id=None, file=None, state=None):
+        # The store only queues the row; the UI gets it (with its row id) right away
+        record = self.store.append(contact_id, from_me, text, media_type, message_id, file, state)
         if self.new_message_callback:
-            self.new_message_callback({
-                "contact_id": contact_id,
-                "from_me": False,
-                "text": text,
-                "media": media_type,
-                "message_id": message.message_id,
-            })
+            self.new_message_callback({"contact_id": contact_id, **record})
+        return record
 
-        self.save_message(contact_id, False, text, media_type, message.message_id)
-
-    def save_message(self, contact_id, from_me, text, media_type, message_id=None):
-        path = os.path.join(CHAT_DIR, f"{contact_id}.json")
-        history = []
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                history = json.load(f)
-        history.append({
-            "from_me": from_me,
-            "text": text,
-            "media": media_type,
-            "message_id": message_id
-        })
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
-
-    async def send_message(self, contact_id, text):
-        try:
-            msg = await self.bot.send_message(contact_id, text)
-            self.save_message(contact_id, True, text, None, msg.message_id)
-            if self.new_message_callback:
-                self.new_message_callback({
-                    "contact_id": contact_id,
-                    "from_me": True,
-                    "text": text,
-                    "media": None,
-                    "message_id": msg.message_id,
-                })
-            return True, None
-        except Exception as e:
-            return False, str(e)
+    def send_message(self, contact_id, text):
+        # Saved as pending first, so it survives a failure or a restart; the outbox delivers it
+        record = self.save_message(contact_id, True, text, None, state="pending")
+        self.outbox.enqueue(contact_id, record)
 
-    async def send_photo(self, contact_id, photo_path):
+    async def send_files(self, contact_id, paths):
+        def on_sent(upload, msg):
+            self.save_message(contact_id, True, upload.label, upload.kind, msg.message_id)
         try:
-            photo = FSInputFile(photo_path)
-            msg = await self.bot.send_photo(contact_id, photo=photo)
-            self.save_message(contact_id, True, f"[Photo: {os.path.basename(photo_path)}]", "photo", msg.message_id)
-            if self.new_message_callback:
-                self.new_message_callback({
-                    "contact_id": contact_id,
-                    "from_me": True,
-                    "text": f"[Photo: {os.path.basename(photo_path)}]",
-                    "media": "photo",
-                    "message_id": msg.message_id,
-                })
+            await self.uploader.send(contact_id, paths, on_sent)
             return True, None
         except Exception as e:
             return False, str(e)
 
-    async def start_polling(self):
-        await self.dp.start_polling(self.bot)
+    def start(self):
+        self.outbox.resume()
+        self.task = asyncio.create_task(webhook.run(self.dp, [self.bot], stop=self.stopping))
+
+    async def stop(self):
+        # The webhook server answers the updates it is still handling before it closes; polling just ends
+        self.stopping.set()
+        if RUN_MODE == "webhook" and self.task:
+            await self.task
+
+class BroadcastDialog(QDialog):
+    def __init__(self, parent, selected_count, all_count):
+        super().__init__(parent)
+        self.setWindowTitle("Broadcast")
+        self.paths = []
+
+        self.text_input = QTextEdit()
+        self.text_input.setPlaceholderText("Message text (optional if files are attached)")
+
+        self.btn_attach = QPushButton("Attach Files...")
+        self.btn_attach.clicked.connect(self.attach_files)
+        self.files_label = QLabel("No files attached")
+
+        self.to_selected = QRadioButton(f"Selected contacts ({selected_count})")
+        self.to_selected.setEnabled(selected_count > 0)
+        self.to_all = QRadioButton(f"All contacts ({all_count})")
+        (self.to_selected if selected_count > 1 else self.to_all).setChecked(True)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.text_input)
+        files_layout = QHBoxLayout()
+        files_layout.addWidget(self.btn_attach)
+        files_layout.addWidget(self.files_label)
+        layout.addLayout(files_layout)
+        layout.addWidget(self.to_selected)
+        layout.addWidget(self.to_all)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def attach_files(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, "Select Photos/Videos/Files")
+        if paths:
+            self.paths = paths
+            self.files_label.setText(f"{len(paths)} file(s) attached")
+
+    @property
+    def text(self):
+        return self.text_input.toPlainText().strip()
 
 class MainWindow(QWidget):
     def __init__(self):
@@ -102,27 +126,81 @@ class MainWindow(QWidget):
         self.setWindowTitle("TG Desktop Messenger")
         self.resize(800, 600)
 
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search messages...")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.search_status = QLabel()
+        self.search_status.hide()
+        self.search_results = QListWidget()
+        self.search_results.setMaximumWidth(250)
+        self.search_results.itemActivated.connect(self.open_search_hit)
+        self.search_results.itemClicked.connect(self.open_search_hit)
+        self.search_results.hide()
+        self.pending_jump = None
+        self.search_seq = 0
+
         self.contacts_list = QListWidget()
         self.contacts_list.setMaximumWidth(250)
+        # Ctrl/Shift-click picks broadcast recipients; the current item is still the open chat
+        self.contacts_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
 
         self.btn_add_contact = QPushButton("Add Contact")
         self.btn_add_contact.clicked.connect(self.add_contact_dialog)
 
-        self.chat_display = QListWidget()
+        self.btn_broadcast = QPushButton("Broadcast...")
+        self.btn_broadcast.clicked.connect(self.start_broadcast)
+        self.broadcast_progress = QProgressBar()
+        self.broadcast_progress.hide()
+        self.broadcast_status = QLabel()
+        self.broadcast_status.setWordWrap(True)
+        self.broadcast_status.hide()
+
+        self.store = HistoryStore()
+        # The writer runs in its own thread, so its failures are picked up here rather than raised
+        self.store_status = QLabel()
+        self.store_status.setWordWrap(True)
+        self.store_status.setStyleSheet("color: red")
+        self.store_status.hide()
+        self.store_timer = QTimer(self)
+        self.store_timer.timeout.connect(self.check_store)
+        self.store_timer.start(1000)
+        self.bot_runner = TelegramBotRunner(self.store)
+        self.bot_runner.new_message_callback = self.on_new_message
+        self.bot_runner.outbox.on_update = self.on_message_state
+
+        self.chat_model = ChatModel(self.store, self.bot_runner.media, self)
+        self.chat_display = QListView()
+        # Rows with a thumbnail are taller; the model gives their size so laying out never loads pictures
+        self.chat_display.setIconSize(QSize(THUMB_SIZE, THUMB_SIZE))
+        self.chat_display.setModel(self.chat_model)
+        self.chat_display.verticalScrollBar().valueChanged.connect(self.on_chat_scrolled)
+        self.chat_display.doubleClicked.connect(self.on_message_activated)
         self.message_input = QLineEdit()
         self.message_input.setPlaceholderText("Type a message...")
         self.message_input.returnPressed.connect(self.send_text_message)
 
-        self.btn_send_file = QPushButton("Send Photo/GIF")
+        self.btn_send_file = QPushButton("Send Media")
         self.btn_send_file.clicked.connect(self.send_file)
 
         self.btn_delete_message = QPushButton("Delete Selected")
         self.btn_delete_message.clicked.connect(self.delete_selected_messages)
 
         left_layout = QVBoxLayout()
+        left_layout.addWidget(self.search_input)
+        left_layout.addWidget(self.search_status)
+        left_layout.addWidget(self.search_results)
         left_layout.addWidget(QLabel("Contacts:"))
         left_layout.addWidget(self.contacts_list)
         left_layout.addWidget(self.btn_add_contact)
+        left_layout.addWidget(self.btn_broadcast)
+        left_layout.addWidget(self.broadcast_progress)
+        left_layout.addWidget(self.broadcast_status)
+        left_layout.addWidget(self.store_status)
 
         right_layout = QVBoxLayout()
         right_layout.addWidget(QLabel("Chat History:"))
@@ -143,56 +221,126 @@ class MainWindow(QWidget):
         self.load_contacts()
         self.contacts_list.currentItemChanged.connect(self.display_chat_history)
 
-        self.bot_runner = TelegramBotRunner()
-        self.bot_runner.new_message_callback = self.on_new_message
+    def check_store(self):
+        error = self.store.error
+        if not self.store.writer.is_alive():
+            error = error or "History writer stopped"
+        self.store_status.setText(f"Messages are not being saved.\n{error}" if error else "")
+        self.store_status.setVisible(bool(error))
 
     def load_contacts(self):
-        if os.path.exists(CONTACTS_FILE):
-            with open(CONTACTS_FILE, "r", encoding="utf-8") as f:
-                saved = json.load(f)
-        else:
-            saved = {}
-
-        for filename in os.listdir(CHAT_DIR):
-            if filename.endswith(".json"):
-                try:
-                    contact_id = int(filename.replace(".json", ""))
-                    history = self.load_history(contact_id)
-                    name = saved.get(str(contact_id), str(contact_id))
-                    self.contacts[contact_id] = {"name": name, "history": history}
-                    self.contacts_list.addItem(name)
-                except: pass
-
-    def save_contacts(self):
-        to_save = {str(cid): data["name"] for cid, data in self.contacts.items()}
-        with open(CONTACTS_FILE, "w", encoding="utf-8") as f:
-            json.dump(to_save, f, ensure_ascii=False, indent=2)
-
-    def load_history(self, contact_id):
-        path = os.path.join(CHAT_DIR, f"{contact_id}.json")
-        if not os.path.exists(path): return []
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-    def save_history(self, contact_id):
-        path = os.path.join(CHAT_DIR, f"{contact_id}.json")
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(self.contacts[contact_id]["history"], f, ensure_ascii=False, indent=2)
+        # Only the compact index is read; a history is loaded when its chat is opened
+        for contact in self.store.contact_index():
+            self.add_contact_item(contact)
+
+    def add_contact_item(self, contact):
+        item = QListWidgetItem()
+        item.setData(Qt.UserRole, contact["id"])
+        contact["item"] = item
+        self.contacts[contact["id"]] = contact
+        self.refresh_contact_item(contact["id"])
+        self.contacts_list.addItem(item)
+
+    def refresh_contact_item(self, contact_id):
+        contact = self.contacts[contact_id]
+        unread = f" ({contact['unread']})" if contact["unread"] else ""
+        contact["item"].setText(f"{contact['name']}{unread}\n{contact['preview']}")
+
+    def current_contact_id(self):
+        current = self.contacts_list.currentItem()
+        return current.data(Qt.UserRole) if current else None
 
     def display_chat_history(self, current, previous=None):
-        self.chat_display.clear()
-        if not current: return
-
-        name = current.text()
-        contact_id = next((cid for cid, data in self.contacts.items() if data["name"] == name), None)
-        if contact_id is None: return
-
-        for i, msg in enumerate(self.contacts[contact_id]["history"]):
-            sender = "Me" if msg["from_me"] else "Them"
-            media = f" [{msg['media']}]" if msg["media"] else ""
-            item = QListWidgetItem(f"{sender}: {msg['text']}{media}")
-            item.setData(Qt.UserRole, i)
-            self.chat_display.addItem(item)
+        contact_id = current.data(Qt.UserRole) if current else None
+        around, self.pending_jump = self.pending_jump, None
+        if contact_id is not None and self.contacts[contact_id]["unread"]:
+            self.contacts[contact_id]["unread"] = 0
+            self.refresh_contact_item(contact_id)
+            self.store.mark_read(contact_id)
+
+        # The reset scrolls to the top for a moment; that must not look like the user asking for older pages
+        scrollbar = self.chat_display.verticalScrollBar()
+        scrollbar.blockSignals(True)
+        self.chat_model.set_contact(contact_id, around)
+        row = self.chat_model.row_of(around) if around is not None else None
+        if row is None:
+            self.chat_display.scrollToBottom()
+        else:
+            index = self.chat_model.index(row)
+            self.chat_display.scrollTo(index, QListView.PositionAtCenter)
+            self.chat_display.setCurrentIndex(index)
+        scrollbar.blockSignals(False)
+
+    def on_chat_scrolled(self, value):
+        scrollbar = self.chat_display.verticalScrollBar()
+        if value == scrollbar.minimum():
+            added = self.chat_model.load_older()
+            if added:
+                # Keep the message that was on top in place instead of jumping to the new first row
+                self.chat_display.scrollTo(self.chat_model.index(added), QListView.PositionAtTop)
+        elif value == scrollbar.maximum():
+            self.chat_model.load_newer()
+
+    def on_message_activated(self, index):
+        if index.data(StateRole) == "failed":
+            contact_id = self.chat_model.contact_id
+            self.store.set_state(index.data(MessageIdRole), "pending")
+            self.chat_model.set_state(index.data(MessageIdRole), "pending")
+            self.bot_runner.outbox.enqueue(contact_id, self.chat_model.message(index))
+            return
+        file = index.data(FileRole)
+        if file: asyncio.create_task(self._open_media_async(file))
+
+    async def _open_media_async(self, file):
+        path = await self.bot_runner.media.fetch(file["file_id"], file["uid"], file["size"])
+        if path:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(os.path.abspath(path)))
+        else:
+            QTimer.singleShot(0, lambda: QMessageBox.warning(
+                self, "Error", "Could not download the file. Bots can only download files up to 20 MB."
+            ))
+
+    def run_search(self):
+        self.search_seq += 1
+        text = self.search_input.text().strip()
+        if not text:
+            self.search_results.clear()
+            self.search_results.hide()
+            self.search_status.hide()
+            return
+        asyncio.create_task(self._search_async(self.search_seq, text))
+
+    async def _search_async(self, seq, text):
+        started = time.perf_counter()
+        hits = await asyncio.to_thread(self.store.search, text)
+        if seq != self.search_seq: return # The query changed while this one ran
+
+        elapsed = (time.perf_counter() - started) * 1000
+        self.search_results.clear()
+        for contact_id, row_id, from_me, snippet in hits:
+            contact = self.contacts.get(contact_id)
+            name = contact["name"] if contact else str(contact_id)
+            sender = "Me" if from_me else "Them"
+            item = QListWidgetItem(f"{name}\n{sender}: {snippet}")
+            item.setData(Qt.UserRole, (contact_id, row_id))
+            self.search_results.addItem(item)
+
+        status = f"{len(hits)} results in {elapsed:.0f} ms"
+        if self.store.index_progress < 1:
+            status += f" (indexing older messages: {self.store.index_progress:.0%})"
+        self.search_status.setText(status)
+        self.search_status.show()
+        self.search_results.show()
+
+    def open_search_hit(self, item):
+        contact_id, row_id = item.data(Qt.UserRole)
+        if contact_id not in self.contacts: return
+        self.pending_jump = row_id
+        contact_item = self.contacts[contact_id]["item"]
+        if self.contacts_list.currentItem() is contact_item:
+            self.display_chat_history(contact_item)
+        else:
+            self.contacts_list.setCurrentItem(contact_item)
 
     def add_contact_dialog(self):
         contact_text, ok = QInputDialog.getText(self, "Add Contact", "Enter ID:")
@@ -219,73 +367,134 @@ class MainWindow(QWidget):
 
     def _add_contact(self, contact_id, name):
         if contact_id not in self.contacts:
-            self.contacts[contact_id] = {"name": name, "history": []}
-            self.contacts_list.addItem(name)
+            self.add_contact_item({"id": contact_id, "name": name, "preview": "", "unread": 0, "blocked": False})
         else:
             self.contacts[contact_id]["name"] = name
-        self.save_contacts()
-        self.save_history(contact_id)
-
-    @asyncSlot()
-    async def send_text_message(self):
-        current_item = self.contacts_list.currentItem()
-        if not current_item: return
+            self.refresh_contact_item(contact_id)
+        self.store.save_contact(contact_id, name)
 
-        contact_id = next((cid for cid, d in self.contacts.items() if d["name"] == current_item.text()), None)
+    def send_text_message(self):
+        contact_id = self.current_contact_id()
         text = self.message_input.text().strip()
-        if not text or not contact_id: return
+        if not text or contact_id is None: return
         
         self.message_input.clear()
-        success, error = await self.bot_runner.send_message(contact_id, text)
-        if not success: QMessageBox.warning(self, "Error", error)
+        self.bot_runner.send_message(contact_id, text)
+
+    def on_message_state(self, contact_id, row_id, state, message_id):
+        if self.chat_model.contact_id == contact_id:
+            self.chat_model.set_state(row_id, state, message_id)
 
     def send_file(self):
-        current_item = self.contacts_list.currentItem()
-        if not current_item: return
+        contact_id = self.current_contact_id()
+        if contact_id is None: return
 
-        path, _ = QFileDialog.getOpenFileName(self, "Select Photo/GIF")
-        if not path: return
+        paths, _ = QFileDialog.getOpenFileNames(self, "Select Photos/Videos/Files")
+        if not paths: return
 
-        contact_id = next((cid for cid, d in self.contacts.items() if d["name"] == current_item.text()), None)
-        asyncio.create_task(self._send_file_async(contact_id, path))
+        # Not awaited: another chat can start its own upload while this one runs
+        asyncio.create_task(self._send_file_async(contact_id, paths))
 
-    async def _send_file_async(self, contact_id, path):
-        success, err = await self.bot_runner.send_photo(contact_id, path)
+    async def _send_file_async(self, contact_id, paths):
+        success, err = await self.bot_runner.send_files(contact_id, paths)
         if not success: QTimer.singleShot(0, lambda: QMessageBox.warning(self, "Error", err))
 
     def on_new_message(self, data):
         cid = data["contact_id"]
         if cid not in self.contacts:
-            self.contacts[cid] = {"name": str(cid), "history": []}
-            self.contacts_list.addItem(str(cid))
-            self.save_contacts()
-
-        self.contacts[cid]["history"].append({
-            "from_me": data["from_me"], "text": data["text"], 
-            "media": data["media"], "message_id": data.get("message_id")
-        })
-        self.save_history(cid)
-        
-        current = self.contacts_list.currentItem()
-        if current and self.contacts[cid]["name"] == current.text():
-            self.display_chat_history(current)
+            self.add_contact_item({"id": cid, "name": str(cid), "preview": "", "unread": 0, "blocked": False})
+
+        contact = self.contacts[cid]
+        contact["preview"] = preview(data["text"], data["media"])
+        is_open = self.chat_model.contact_id == cid
+        if not data["from_me"]:
+            contact["blocked"] = False
+            # The store counted it as unread; an open chat reads it right away
+            if is_open:
+                self.store.mark_read(cid)
+            else:
+                contact["unread"] += 1
+        self.refresh_contact_item(cid)
+
+        if is_open:
+            scrollbar = self.chat_display.verticalScrollBar()
+            follow = scrollbar.value() == scrollbar.maximum()
+            self.chat_model.append({
+                "id": data["id"], "from_me": data["from_me"], "text": data["text"],
+                "media": data["media"], "message_id": data.get("message_id"), "file": data.get("file"),
+                "state": data.get("state")
+            })
+            if follow:
+                self.chat_display.scrollToBottom()
+
+    def start_broadcast(self):
+        selected = [item.data(Qt.UserRole) for item in self.contacts_list.selectedItems()]
+        everyone = list(self.contacts)
+        dialog = BroadcastDialog(self, len(selected), len(everyone))
+        if dialog.exec() != QDialog.Accepted: return
+        if not dialog.text and not dialog.paths: return
+
+        targets = selected if dialog.to_selected.isChecked() else everyone
+        skipped = sum(self.contacts[cid]["blocked"] for cid in targets)
+        targets = [cid for cid in targets if not self.contacts[cid]["blocked"]]
+        asyncio.create_task(self.run_broadcast(targets, dialog.text, dialog.paths, skipped))
+
+    async def run_broadcast(self, targets, text, paths, skipped):
+        self.btn_broadcast.setEnabled(False)
+        self.broadcast_progress.setRange(0, len(targets))
+        self.broadcast_progress.setValue(0)
+        self.broadcast_progress.show()
+        self.broadcast_status.setText(f"Preparing... ({skipped} blocked contacts skipped)")
+        self.broadcast_status.show()
+        try:
+            stats, records = await self.bot_runner.broadcaster.run(targets, text, paths, self.show_broadcast_progress)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Broadcast failed.\n{e}")
+            return
+        finally:
+            self.btn_broadcast.setEnabled(True)
+            self.broadcast_progress.hide()
+
+        for cid in stats.blocked_ids:
+            self.contacts[cid]["blocked"] = True
+        self.apply_sent_records(records)
+        self.broadcast_status.setText(
+            f"Broadcast done: {stats.sent} sent, {stats.blocked} blocked the bot, {stats.failed} failed, "
+            f"{skipped} skipped, {stats.rate:.1f} msg/s"
+        )
+
+    def show_broadcast_progress(self, stats):
+        self.broadcast_progress.setValue(stats.done)
+        self.broadcast_status.setText(
+            f"Sent {stats.sent}/{stats.total} · blocked {stats.blocked} · failed {stats.failed}"
+            f" · {stats.rate:.1f} msg/s · flood waits {stats.flood_waits}"
+        )
+
+    def apply_sent_records(self, records):
+        """Shows a batch of our own stored messages: one refresh per contact, not per message."""
+        touched = set()
+        for cid, msg in records:
+            self.contacts[cid]["preview"] = preview(msg["text"], msg["media"])
+            touched.add(cid)
+            if self.chat_model.contact_id == cid:
+                self.chat_model.append(msg)
+        for cid in touched:
+            self.refresh_contact_item(cid)
 
     def delete_selected_messages(self):
-        current_item = self.contacts_list.currentItem()
-        if not current_item: return
-        
-        contact_id = next((cid for cid, d in self.contacts.items() if d["name"] == current_item.text()), None)
-        selected_items = self.chat_display.selectedItems()
-        if not selected_items: return
-
-        indices = sorted([item.data(Qt.UserRole) for item in selected_items], reverse=True)
-        for idx in indices:
-            msg = self.contacts[contact_id]["history"].pop(idx)
-            if msg.get("message_id"):
-                asyncio.create_task(self.bot_runner.bot.delete_message(contact_id, msg["message_id"]))
+        contact_id = self.current_contact_id()
+        if contact_id is None: return
 
-        self.save_history(contact_id)
-        self.display_chat_history(current_item)
+        selected = self.chat_display.selectionModel().selectedIndexes()
+        if not selected: return
+
+        row_ids = {index.data(MessageIdRole) for index in selected}
+        for msg in self.chat_model.take(row_ids):
+            if msg.get("state") == "pending":
+                self.bot_runner.outbox.cancel([msg["id"]])
+            elif msg.get("message_id"):
+                asyncio.create_task(self.bot_runner.bot.delete_message(contact_id, msg["message_id"]))
+        self.store.delete(row_ids)
 
 def main():
     app = QApplication(sys.argv)
@@ -293,8 +502,13 @@ def main():
     asyncio.set_event_loop(loop)
     window = MainWindow()
     window.show()
-    QTimer.singleShot(0, lambda: asyncio.create_task(window.bot_runner.start_polling()))
-    with loop: loop.run_forever()
+    QTimer.singleShot(0, window.bot_runner.start)
+    with loop:
+        loop.run_forever()
+        loop.run_until_complete(window.bot_runner.stop())
+    error = window.store.close()
+    if error:
+        QMessageBox.critical(None, "Error", f"Some changes to the history could not be saved.\n{error}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,137 @@
+import time
+import asyncio
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError
+
+from src.config import BROADCAST_RATE, CHAT_INTERVAL, BROADCAST_WORKERS, PROGRESS_INTERVAL
+from src.store import HistoryStore
+from src.uploads import Uploader, prepare
+
+class RateLimiter:
+    """At most `rate` messages per second overall and one per `chat_interval` to any single chat.
+
+    One instance is shared by everything the bot sends. An album takes one slot per file.
+    pause() stops everyone, for TelegramRetryAfter applies to the whole bot.
+    """
+
+    def __init__(self, rate=BROADCAST_RATE, chat_interval=CHAT_INTERVAL):
+        self.interval = 1 / rate
+        self.chat_interval = chat_interval
+        self.next_slot = 0.0
+        self.chat_next = {}
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, chat_id, weight=1):
+        while True:
+            async with self.lock:
+                now = time.monotonic()
+                slot = max(now, self.next_slot, self.paused_until)
+                self.next_slot = slot + self.interval * weight
+                slot = max(slot, self.chat_next.get(chat_id, 0.0))
+                self.chat_next[chat_id] = slot + self.chat_interval * weight
+            await asyncio.sleep(slot - now)
+            # A flood wait that arrived while we slept invalidates the slot
+            if time.monotonic() >= self.paused_until:
+                return
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+class BroadcastStats:
+    def __init__(self, total):
+        self.total = total
+        self.sent = 0
+        self.blocked_ids = []
+        self.failed = 0
+        self.flood_waits = 0
+        self.started = time.monotonic()
+
+    @property
+    def blocked(self):
+        return len(self.blocked_ids)
+
+    @property
+    def done(self):
+        return self.sent + self.blocked + self.failed
+
+    @property
+    def rate(self):
+        return self.sent / max(time.monotonic() - self.started, 1e-6)
+
+class Broadcaster:
+    """Sends one text and/or set of files to many contacts through a pool of workers.
+
+    Files are hashed once and uploaded to the first contact only; the rest get the cached
+    file_id. Delivered messages are written to the histories in one batch at the end. The
+    limiter is the uploader's too, so every album and file waits for its own slots.
+    """
+
+    def __init__(self, bot: Bot, store: HistoryStore, uploader: Uploader, limiter: RateLimiter):
+        self.bot = bot
+        self.store = store
+        self.uploader = uploader
+        self.limiter = limiter
+
+    async def run(self, contact_ids, text=None, paths=(), on_progress=None):
+        """Returns the stats and the (contact_id, message) records that were stored."""
+        stats = BroadcastStats(len(contact_ids))
+        limiter = self.limiter
+        uploads = await asyncio.to_thread(prepare, paths) if paths else []
+        rows = []
+        last_report = 0.0
+
+        async def attempt(contact_id):
+            nonlocal last_report
+            # A retry after a flood wait resumes after the files already delivered. Groups are
+            # cut from the front, so the rest splits into the same albums as the first time
+            delivered = 0
+
+            def on_sent(upload, msg):
+                nonlocal delivered
+                delivered += 1
+                rows.append((contact_id, True, upload.label, upload.kind, msg.message_id))
+
+            while True:
+                try:
+                    if delivered < len(uploads):
+                        await self.uploader.send_prepared(contact_id, uploads[delivered:], on_sent)
+                    if text:
+                        await limiter.acquire(contact_id)
+                        msg = await self.bot.send_message(contact_id, text)
+                        rows.append((contact_id, True, text, None, msg.message_id))
+                    stats.sent += 1
+                    break
+                except TelegramRetryAfter as e:
+                    stats.flood_waits += 1
+                    limiter.pause(e.retry_after)
+                except TelegramForbiddenError:
+                    # Blocked the bot or deactivated: no point in retrying
+                    stats.blocked_ids.append(contact_id)
+                    break
+                except Exception:
+                    stats.failed += 1
+                    break
+            if on_progress and time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                on_progress(stats)
+
+        queue = asyncio.Queue()
+        for contact_id in contact_ids:
+            queue.put_nowait(contact_id)
+
+        async def worker():
+            while not queue.empty():
+                await attempt(queue.get_nowait())
+
+        if uploads and not queue.empty():
+            # The first delivery fills the upload cache, so the workers only send file_ids
+            await attempt(queue.get_nowait())
+        await asyncio.gather(*(worker() for _ in range(BROADCAST_WORKERS)))
+
+        records = self.store.append_many(rows)
+        self.store.set_blocked(stats.blocked_ids)
+        if on_progress:
+            on_progress(stats)
+        return stats, records
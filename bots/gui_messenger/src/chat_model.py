@@ -0,0 +1,163 @@
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QSize
+from PySide6.QtGui import QBrush
+
+from src.config import HISTORY_PAGE, THUMB_SIZE
+from src.store import HistoryStore
+from src.media import MediaCache, Thumbnails
+
+MessageIdRole = Qt.UserRole
+FileRole = Qt.UserRole + 1
+StateRole = Qt.UserRole + 2
+STATE_LABELS = {"pending": " (sending...)", "failed": " (not sent, double-click to retry)"}
+STATE_COLORS = {"pending": Qt.gray, "failed": Qt.red}
+
+def format_message(msg):
+    sender = "Me" if msg["from_me"] else "Them"
+    file = msg.get("file")
+    name = f": {file['name']}" if file and file["name"] else ""
+    media = f" [{msg['media']}{name}]" if msg["media"] else ""
+    state = STATE_LABELS.get(msg.get("state"), "")
+    return f"{sender}: {msg['text']}{media}{state}"
+
+def has_thumbnail(msg):
+    return bool(msg.get("file") and msg["file"]["thumb_uid"])
+
+class ChatModel(QAbstractListModel):
+    """The open conversation, oldest message first.
+
+    Starts with the newest page, or a page around one message when jumping to a search hit,
+    and grows through load_older()/load_newer(), so only what the user scrolled through is in
+    memory. Rows are identified by their store row id (MessageIdRole), which stays valid while
+    rows are inserted or removed around them. Thumbnails of received media are only requested
+    when the view paints their row.
+    """
+
+    def __init__(self, store: HistoryStore, cache: MediaCache, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.thumbnails = Thumbnails(cache, self.thumbnail_ready)
+        self.contact_id = None
+        self.messages = []
+        self.has_older = False
+        self.has_newer = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.messages)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        msg = self.messages[index.row()]
+        if role == Qt.DisplayRole:
+            return format_message(msg)
+        if role == MessageIdRole:
+            return msg["id"]
+        if role == FileRole:
+            return msg.get("file")
+        if role == StateRole:
+            return msg.get("state")
+        if role == Qt.ForegroundRole and msg.get("state"):
+            return QBrush(STATE_COLORS[msg["state"]])
+        if has_thumbnail(msg):
+            # With the size given here, the view asks for the picture only when painting the row
+            if role == Qt.SizeHintRole:
+                return QSize(THUMB_SIZE, THUMB_SIZE + 8)
+            if role == Qt.DecorationRole:
+                return self.thumbnails.get(msg["file"])
+        return None
+
+    def message(self, index):
+        return self.messages[index.row()]
+
+    def set_state(self, row_id, state, message_id=None):
+        """Shows an outbox message's new state in place, if it is loaded."""
+        row = self.row_of(row_id)
+        if row is None:
+            return
+        msg = self.messages[row]
+        msg["state"] = state
+        msg["message_id"] = message_id or msg.get("message_id")
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def thumbnail_ready(self, thumb_uid):
+        for row, msg in enumerate(self.messages):
+            if has_thumbnail(msg) and msg["file"]["thumb_uid"] == thumb_uid:
+                index = self.index(row)
+                self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def set_contact(self, contact_id, around=None):
+        self.beginResetModel()
+        self.contact_id = contact_id
+        self.has_newer = False
+        if contact_id is None:
+            self.messages = []
+            self.has_older = False
+        elif around is None:
+            self.messages = self.store.page(contact_id)
+            self.has_older = len(self.messages) == HISTORY_PAGE
+        else:
+            half = HISTORY_PAGE // 2
+            older = self.store.page(contact_id, limit=half, before=around + 1)
+            newer = self.store.page_after(contact_id, around, limit=half)
+            self.messages = older + newer
+            self.has_older = len(older) == half
+            self.has_newer = len(newer) == half
+        self.endResetModel()
+
+    def load_older(self):
+        """Prepends the page before the oldest loaded message; returns how many rows were added."""
+        if not self.has_older or not self.messages:
+            return 0
+        older = self.store.page(self.contact_id, before=self.messages[0]["id"])
+        self.has_older = len(older) == HISTORY_PAGE
+        if older:
+            self.beginInsertRows(QModelIndex(), 0, len(older) - 1)
+            self.messages[:0] = older
+            self.endInsertRows()
+        return len(older)
+
+    def load_newer(self):
+        """Appends the page after the newest loaded message; returns how many rows were added."""
+        if not self.has_newer or not self.messages:
+            return 0
+        newer = self.store.page_after(self.contact_id, self.messages[-1]["id"])
+        self.has_newer = len(newer) == HISTORY_PAGE
+        if newer:
+            row = len(self.messages)
+            self.beginInsertRows(QModelIndex(), row, row + len(newer) - 1)
+            self.messages.extend(newer)
+            self.endInsertRows()
+        return len(newer)
+
+    def append(self, msg):
+        if self.has_newer:
+            # Not contiguous with what is loaded; load_newer() will reach it
+            return
+        row = len(self.messages)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.messages.append(msg)
+        self.endInsertRows()
+
+    def row_of(self, row_id):
+        # Ids grow with the row, so the position is found by bisection
+        lo, hi = 0, len(self.messages)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.messages[mid]["id"] < row_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.messages) and self.messages[lo]["id"] == row_id:
+            return lo
+        return None
+
+    def take(self, row_ids):
+        """Removes the rows with these ids and returns their messages."""
+        rows = sorted((row for row in map(self.row_of, row_ids) if row is not None), reverse=True)
+        taken = []
+        for row in rows:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            taken.append(self.messages.pop(row))
+            self.endRemoveRows()
+        return taken
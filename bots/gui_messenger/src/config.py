@@ -0,0 +1,55 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+API_TOKEN = os.getenv("API_TOKEN")
+
+CHAT_DIR = "Chats"
+os.makedirs(CHAT_DIR, exist_ok=True)
+CONTACTS_FILE = "contacts.json" # Old name list, imported into the contact index once
+
+# Receiving updates
+RUN_MODE = os.getenv("RUN_MODE", "polling") # "webhook" to receive updates over HTTP
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "") # Public https address Telegram posts to; empty to register it yourself
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook") # The bot is served at <path>/<bot id>
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+DRAIN_TIMEOUT = 60 # Seconds shutdown waits for updates still being handled
+
+# History store
+HISTORY_DB = os.path.join(CHAT_DIR, "history.db") # Every conversation, appended by one writer thread
+HISTORY_PAGE = 200 # Newest messages loaded when a chat is opened
+FLUSH_INTERVAL = 0.2 # Seconds the writer waits to gather more rows into one commit
+FLUSH_BATCH = 500 # Rows per commit at most
+PREVIEW_LENGTH = 60 # Characters of the last message shown in the contact list
+INDEX_CHUNK = 20000 # Old messages added to the search index per step while the writer is idle
+SEARCH_LIMIT = 100 # Hits shown for a search
+SEARCH_DELAY = 200 # Milliseconds of typing pause before the search runs
+WRITE_RETRY_DELAY = 1.0 # Seconds before a commit that failed (disk full, file locked) is tried again; doubles every time
+WRITE_MAX_DELAY = 30.0 # Longest wait between two tries
+CLOSE_TIMEOUT = 10 # Seconds closing keeps retrying a failing commit before its changes are given up
+
+# Media sending
+ALBUM_SIZE = 10 # Telegram's limit of files per send_media_group
+HASH_CHUNK = 1024 * 1024 # Read size while hashing files for the upload cache
+
+# Received media
+MEDIA_DIR = os.path.join(CHAT_DIR, "media") # Downloaded files, named by the hash of their content
+MEDIA_QUOTA = 1024 ** 3 # Bytes of downloads kept; the least recently used go first
+DOWNLOAD_WORKERS = 4 # Downloads running at the same time
+DOWNLOAD_LIMIT = 20 * 1024 * 1024 # Largest file the Bot API lets bots download
+THUMB_SIZE = 160 # Pixels, longest side of the thumbnails in the chat
+THUMB_WORKERS = 2 # Threads decoding thumbnails
+THUMB_MEMORY = 500 # Thumbnails kept in memory
+
+# Outbox
+SEND_WORKERS = 8 # Chats sending typed messages at the same time
+RETRY_DELAY = 1.0 # Seconds before the first retry after a network error; doubles every time
+RETRY_MAX_DELAY = 60.0 # Longest wait between two retries
+
+# Broadcast
+BROADCAST_RATE = 25 # Sends per second overall; Telegram allows bots about 30
+CHAT_INTERVAL = 1.0 # Seconds between two sends to the same chat
+BROADCAST_WORKERS = 16 # Sends in flight at the same time
+PROGRESS_INTERVAL = 0.5 # Seconds between progress updates in the window
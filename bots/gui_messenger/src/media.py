@@ -0,0 +1,183 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QImageReader, QPixmap
+
+from aiogram import Bot
+
+from src.config import MEDIA_DIR, MEDIA_QUOTA, DOWNLOAD_WORKERS, DOWNLOAD_LIMIT, THUMB_SIZE, THUMB_WORKERS, THUMB_MEMORY
+from src.store import HistoryStore
+from src.uploads import sha256_of
+
+# Checked in this order: an animation message carries a document as well
+KINDS = ("video", "animation", "video_note", "voice", "audio", "sticker", "document")
+
+def incoming_file(message):
+    """What the stored row needs to fetch the attachment of a received message later, or None."""
+    if message.photo:
+        largest = message.photo[-1]
+        # The smallest size that still fills a thumbnail is much cheaper to fetch than the photo
+        thumb = next((p for p in message.photo if max(p.width, p.height) >= THUMB_SIZE), largest)
+        return {
+            "kind": "photo", "name": None, "size": largest.file_size,
+            "file_id": largest.file_id, "uid": largest.file_unique_id,
+            "thumb_id": thumb.file_id, "thumb_uid": thumb.file_unique_id,
+        }
+    for kind in KINDS:
+        item = getattr(message, kind)
+        if not item:
+            continue
+        thumb = getattr(item, "thumbnail", None)
+        file = {
+            "kind": kind, "name": getattr(item, "file_name", None), "size": item.file_size,
+            "file_id": item.file_id, "uid": item.file_unique_id,
+            "thumb_id": thumb.file_id if thumb else None, "thumb_uid": thumb.file_unique_id if thumb else None,
+        }
+        if not thumb and kind == "document" and (item.mime_type or "").startswith("image/") and (item.file_size or 0) <= DOWNLOAD_LIMIT:
+            # A picture sent as a file is its own thumbnail
+            file["thumb_id"], file["thumb_uid"] = item.file_id, item.file_unique_id
+        return file
+    return None
+
+def make_thumbnail(path):
+    """Runs in the thumbnail pool; decodes the image at thumbnail size rather than in full."""
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if size.isValid():
+        reader.setScaledSize(size.scaled(THUMB_SIZE, THUMB_SIZE, Qt.KeepAspectRatio))
+    image = reader.read()
+    return None if image.isNull() else image
+
+class MediaCache:
+    """Received files on disk, named by the SHA-256 of their content so nothing is stored twice.
+
+    The store maps Telegram's file_unique_id to the cached name and remembers when each file was
+    last used. Downloads run DOWNLOAD_WORKERS at a time; once the folder is over MEDIA_QUOTA the
+    least recently used files are deleted, to be downloaded again if they are needed.
+    """
+
+    def __init__(self, bot: Bot, store: HistoryStore, root=MEDIA_DIR, quota=MEDIA_QUOTA):
+        self.bot = bot
+        self.store = store
+        self.root = root
+        self.quota = quota
+        self.slots = asyncio.Semaphore(DOWNLOAD_WORKERS)
+        self.downloads = {} # file_unique_id -> task, so a file asked for twice is fetched once
+        os.makedirs(root, exist_ok=True)
+
+    def path_of(self, uid):
+        entry = self.store.media.get(uid)
+        if entry is None:
+            return None
+        path = os.path.join(self.root, entry[0])
+        return path if os.path.exists(path) else None
+
+    async def fetch(self, file_id, uid, size=None):
+        """Path of the cached file, downloaded first if needed; None if Telegram won't serve it."""
+        path = self.path_of(uid)
+        if path:
+            name, size, _ = self.store.media[uid]
+            self.store.remember_media(uid, name, size, time.time())
+            return path
+        if size and size > DOWNLOAD_LIMIT:
+            # Bots cannot download files above 20 MB
+            return None
+        task = self.downloads.get(uid)
+        if task is None:
+            task = self.downloads[uid] = asyncio.create_task(self.download(file_id, uid))
+            task.add_done_callback(lambda _: self.downloads.pop(uid, None))
+        # Whoever gave up waiting must not cancel the download for the others
+        return await asyncio.shield(task)
+
+    async def download(self, file_id, uid):
+        part = os.path.join(self.root, f"{uid}.part")
+        async with self.slots:
+            try:
+                file = await self.bot.get_file(file_id)
+                await self.bot.download_file(file.file_path, destination=part)
+                name, size = await asyncio.to_thread(self.add, part, os.path.splitext(file.file_path)[1])
+            except Exception:
+                # Too big, expired or the connection dropped: the row keeps its label and can be retried
+                if os.path.exists(part):
+                    os.remove(part)
+                return None
+        self.store.remember_media(uid, name, size, time.time())
+        await self.evict()
+        return os.path.join(self.root, name)
+
+    def add(self, part, ext):
+        """Moves a finished download to its content address and returns (name, size)."""
+        sha256 = sha256_of(part)
+        name = os.path.join(sha256[:2], sha256 + ext.lower())
+        os.makedirs(os.path.join(self.root, sha256[:2]), exist_ok=True)
+        size = os.path.getsize(part)
+        os.replace(part, os.path.join(self.root, name))
+        return name, size
+
+    async def evict(self):
+        files = {} # name -> [size, last used, uids]
+        for uid, (name, size, used) in self.store.media.items():
+            entry = files.setdefault(name, [size, used, []])
+            entry[1] = max(entry[1], used)
+            entry[2].append(uid)
+        total = sum(entry[0] for entry in files.values())
+        if total <= self.quota:
+            return
+
+        victims = []
+        # The newest file is never evicted, even if it alone is over the quota
+        for name, (size, _, uids) in sorted(files.items(), key=lambda item: item[1][1])[:-1]:
+            if total <= self.quota:
+                break
+            total -= size
+            victims.append(name)
+            self.store.forget_media(uids)
+        await asyncio.to_thread(self.remove, victims)
+
+    def remove(self, names):
+        for name in names:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                pass
+
+class Thumbnails:
+    """Small pixmaps of received media, made in a thread pool when a row is first painted.
+
+    The last THUMB_MEMORY are kept in memory; on_ready(thumb_uid) is called as each one arrives.
+    """
+
+    def __init__(self, cache: MediaCache, on_ready):
+        self.cache = cache
+        self.on_ready = on_ready
+        self.pool = ThreadPoolExecutor(THUMB_WORKERS, thread_name_prefix="thumbnails")
+        self.pixmaps = OrderedDict() # thumb_uid -> QPixmap, or None if there is no picture to show
+        self.loading = set()
+
+    def get(self, file):
+        uid = file["thumb_uid"]
+        if uid in self.pixmaps:
+            self.pixmaps.move_to_end(uid)
+            return self.pixmaps[uid]
+        if uid not in self.loading:
+            self.loading.add(uid)
+            asyncio.create_task(self.load(file))
+        return None
+
+    async def load(self, file):
+        uid = file["thumb_uid"]
+        try:
+            path = await self.cache.fetch(file["thumb_id"], uid)
+            image = await asyncio.get_running_loop().run_in_executor(self.pool, make_thumbnail, path) if path else None
+        finally:
+            self.loading.discard(uid)
+        # QPixmap belongs to the GUI thread, so only the decoding happens in the pool
+        self.pixmaps[uid] = QPixmap.fromImage(image) if image else None
+        while len(self.pixmaps) > THUMB_MEMORY:
+            self.pixmaps.popitem(last=False)
+        self.on_ready(uid)
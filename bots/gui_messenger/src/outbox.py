@@ -0,0 +1,92 @@
+import asyncio
+from collections import deque
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramBadRequest, TelegramForbiddenError
+
+from src.config import SEND_WORKERS, RETRY_DELAY, RETRY_MAX_DELAY
+from src.store import HistoryStore
+from src.broadcast import RateLimiter
+
+class Outbox:
+    """Delivers typed messages in the background from rows already saved as "pending".
+
+    Each contact has its own queue drained by one task, so a chat's messages arrive in the order
+    they were written while other chats send at the same time (SEND_WORKERS at most). Network
+    errors are retried with a growing delay; errors Telegram gives for the request itself mark
+    the row "failed". on_update(contact_id, row_id, state, message_id) reports every change.
+    """
+
+    def __init__(self, bot: Bot, store: HistoryStore, limiter: RateLimiter, on_update=None):
+        self.bot = bot
+        self.store = store
+        self.on_update = on_update
+        # Shared with broadcasts and file sends, so together they stay within Telegram's limits
+        self.limiter = limiter
+        self.slots = asyncio.Semaphore(SEND_WORKERS)
+        self.queues = {} # contact_id -> deque of messages, only while its task runs
+        self.cancelled = set()
+
+    def resume(self):
+        """Queues what was still pending when the app last closed."""
+        for contact_id, message in self.store.outbox():
+            self.enqueue(contact_id, message)
+
+    def enqueue(self, contact_id, message):
+        if contact_id in self.queues:
+            self.queues[contact_id].append(message)
+        else:
+            self.queues[contact_id] = deque([message])
+            asyncio.create_task(self.drain(contact_id))
+
+    def cancel(self, row_ids):
+        """Drops deleted messages; one already being sent is deleted from the chat once delivered."""
+        self.cancelled.update(row_ids)
+
+    async def drain(self, contact_id):
+        queue = self.queues[contact_id]
+        try:
+            while queue:
+                message = queue.popleft()
+                if message["id"] in self.cancelled:
+                    self.cancelled.discard(message["id"])
+                    continue
+                async with self.slots:
+                    await self.deliver(contact_id, message)
+        finally:
+            del self.queues[contact_id]
+
+    async def deliver(self, contact_id, message):
+        row_id = message["id"]
+        delay = RETRY_DELAY
+        while row_id not in self.cancelled:
+            await self.limiter.acquire(contact_id)
+            try:
+                sent = await self.bot.send_message(contact_id, message["text"])
+            except TelegramRetryAfter as e:
+                self.limiter.pause(e.retry_after)
+                continue
+            except (TelegramBadRequest, TelegramForbiddenError):
+                # Chat not found, bot blocked, text too long: sending again would not help
+                self.update(contact_id, row_id, "failed")
+                return
+            except Exception:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RETRY_MAX_DELAY)
+                continue
+
+            if row_id in self.cancelled:
+                self.cancelled.discard(row_id)
+                try:
+                    await self.bot.delete_message(contact_id, sent.message_id)
+                except Exception:
+                    pass
+            else:
+                self.update(contact_id, row_id, None, sent.message_id)
+            return
+        self.cancelled.discard(row_id)
+
+    def update(self, contact_id, row_id, state, message_id=None):
+        self.store.set_state(row_id, state, message_id)
+        if self.on_update:
+            self.on_update(contact_id, row_id, state, message_id)
@@ -0,0 +1,450 @@
+import os
+import json
+import time
+import queue
+import sqlite3
+import logging
+import threading
+
+from src.config import (
+    CHAT_DIR, CONTACTS_FILE, HISTORY_DB, HISTORY_PAGE, FLUSH_INTERVAL, FLUSH_BATCH, PREVIEW_LENGTH,
+    INDEX_CHUNK, SEARCH_LIMIT, WRITE_RETRY_DELAY, WRITE_MAX_DELAY, CLOSE_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    contact_id INTEGER NOT NULL,
+    from_me INTEGER NOT NULL,
+    text TEXT,
+    media TEXT,
+    message_id INTEGER,
+    date INTEGER NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    file TEXT,
+    state TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_contact ON messages (contact_id, id);
+CREATE TABLE IF NOT EXISTS contacts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    preview TEXT NOT NULL DEFAULT '',
+    unread INTEGER NOT NULL DEFAULT 0,
+    last_id INTEGER NOT NULL DEFAULT 0,
+    blocked INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS uploads (
+    sha256 TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    file_id TEXT NOT NULL,
+    PRIMARY KEY (sha256, kind)
+);
+CREATE TABLE IF NOT EXISTS media (
+    uid TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+# Rows up to fts_target existed before the index did and are added in the background up to
+# fts_built; everything newer is indexed by the insert trigger as it is written
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    text, content='messages', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages WHEN new.deleted = 0 BEGIN
+    INSERT INTO messages_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER UPDATE OF deleted ON messages
+WHEN old.deleted = 0 AND new.deleted = 1 AND (
+    old.id > (SELECT value FROM meta WHERE key = 'fts_target') OR old.id <= (SELECT value FROM meta WHERE key = 'fts_built')
+) BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+# New messages refresh the preview and count towards unread unless they are our own;
+# a user who writes to us again has evidently unblocked the bot
+UPSERT_CONTACT_MESSAGE = """
+INSERT INTO contacts (id, name, preview, unread, last_id) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET preview = excluded.preview, unread = unread + excluded.unread, last_id = excluded.last_id,
+    blocked = CASE WHEN excluded.unread > 0 THEN 0 ELSE blocked END
+"""
+
+COLUMNS = "id, from_me, text, media, message_id, file, state"
+
+def connect(path, **kwargs):
+    conn = sqlite3.connect(path, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def row_to_message(row):
+    return {
+        "id": row[0], "from_me": bool(row[1]), "text": row[2], "media": row[3], "message_id": row[4],
+        "file": json.loads(row[5]) if row[5] else None, "state": row[6]
+    }
+
+def fts_query(text):
+    """Every word must appear; the last one may be unfinished, as it is while the user types."""
+    words = ['"' + word.replace('"', '""') + '"' for word in text.split()]
+    if words:
+        words[-1] += "*"
+    return " ".join(words)
+
+def preview(text, media=None):
+    text = (text or "").replace("\n", " ")
+    return text[:PREVIEW_LENGTH] if text else f"[{media}]" if media else ""
+
+class HistoryStore:
+    """Append-only history of every conversation in one SQLite file.
+
+    Row ids are handed out immediately, so callers can refer to a message before it is on disk;
+    the rows themselves are queued to a single writer thread that commits them in batches.
+    Deleting only marks rows, nothing is rewritten. Reads see queued changes too. A commit that
+    fails is retried; `error` holds the last failure until a commit succeeds again.
+    """
+
+    def __init__(self, path=HISTORY_DB):
+        conn = connect(path)
+        conn.executescript(SCHEMA)
+        if "blocked" not in {row[1] for row in conn.execute("PRAGMA table_info(contacts)")}:
+            conn.execute("ALTER TABLE contacts ADD COLUMN blocked INTEGER NOT NULL DEFAULT 0")
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+        if "file" not in columns:
+            conn.execute("ALTER TABLE messages ADD COLUMN file TEXT")
+        if "state" not in columns:
+            conn.execute("ALTER TABLE messages ADD COLUMN state TEXT")
+        # Only undelivered rows have a state, so finding the outbox at startup costs next to nothing
+        conn.execute("CREATE INDEX IF NOT EXISTS messages_outbox ON messages (id) WHERE state IS NOT NULL")
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) SELECT 'fts_target', COALESCE(MAX(id), 0) FROM messages"
+            )
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('fts_built', 0)")
+        conn.executescript(SEARCH_SCHEMA)
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        self.fts_target, self.fts_built = meta["fts_target"], meta["fts_built"]
+        self.migrate(conn)
+        self.migrate_contacts(conn)
+        self.next_id = (conn.execute("SELECT MAX(id) FROM messages").fetchone()[0] or 0) + 1
+        # (content hash, kind) -> Telegram file_id of files this bot already uploaded
+        self.file_ids = {(sha, kind): file_id for sha, kind, file_id in conn.execute("SELECT sha256, kind, file_id FROM uploads")}
+        # file_unique_id of received files -> [cached name, size, last used]
+        self.media = {uid: [name, size, used] for uid, name, size, used in conn.execute("SELECT uid, name, size, used FROM media")}
+        conn.close()
+
+        self.path = path
+        self.reader = connect(path)
+        # Searches run in worker threads so that ranking a very common word never stalls the window
+        self.searcher = connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.pending = {} # row id -> (contact id, message) queued but not committed yet
+        self.pending_deletes = set()
+        self.queue = queue.Queue()
+        self.error = None
+        self.close_deadline = None # Set by close(): past it, failing commits are given up
+        self.writer = threading.Thread(target=self.write_loop, name="history-writer", daemon=True)
+        self.writer.start()
+
+    def migrate(self, conn):
+        """One-time import of the old Chats/<id>.json files, which are kept as .json.bak.
+
+        Each import is recorded in meta within its own transaction, so a file left behind by a
+        crash before the rename is only renamed on the next start, not imported twice.
+        """
+        for filename in sorted(os.listdir(CHAT_DIR)):
+            stem, ext = os.path.splitext(filename)
+            if ext != ".json" or not stem.lstrip("-").isdigit():
+                continue
+            path = os.path.join(CHAT_DIR, filename)
+            key = f"migrated:{filename}"
+            if conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                os.replace(path, path + ".bak")
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    history = json.load(f)
+            except (OSError, ValueError):
+                continue
+            now = int(time.time())
+            with conn:
+                conn.executemany(
+                    "INSERT INTO messages (contact_id, from_me, text, media, message_id, date) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(int(stem), int(m.get("from_me", False)), m.get("text"), m.get("media"), m.get("message_id"), now) for m in history]
+                )
+                conn.execute("INSERT INTO meta (key, value) VALUES (?, 1)", (key,))
+            os.replace(path, path + ".bak")
+
+    def migrate_contacts(self, conn):
+        """Builds the contact index once from the old name list and the stored histories."""
+        if conn.execute("SELECT 1 FROM contacts LIMIT 1").fetchone():
+            return
+        names = {}
+        if os.path.exists(CONTACTS_FILE):
+            with open(CONTACTS_FILE, "r", encoding="utf-8") as f:
+                names = {int(cid): name for cid, name in json.load(f).items()}
+
+        last = conn.execute(
+            "SELECT m.contact_id, m.id, m.text, m.media FROM messages m JOIN "
+            "(SELECT contact_id, MAX(id) AS id FROM messages WHERE deleted = 0 GROUP BY contact_id) l ON m.id = l.id"
+        ).fetchall()
+        with conn:
+            for contact_id, last_id, text, media in last:
+                conn.execute(
+                    "INSERT INTO contacts (id, name, preview, last_id) VALUES (?, ?, ?, ?)",
+                    (contact_id, names.pop(contact_id, str(contact_id)), preview(text, media), last_id)
+                )
+            conn.executemany("INSERT INTO contacts (id, name) VALUES (?, ?)", names.items())
+        if os.path.exists(CONTACTS_FILE):
+            os.replace(CONTACTS_FILE, CONTACTS_FILE + ".bak")
+
+    def contact_index(self):
+        """Every contact with its name, last message preview and unread count, most recent first."""
+        rows = self.reader.execute("SELECT id, name, preview, unread, blocked FROM contacts ORDER BY last_id DESC, id").fetchall()
+        return [{"id": row[0], "name": row[1], "preview": row[2], "unread": row[3], "blocked": bool(row[4])} for row in rows]
+
+    def save_contact(self, contact_id, name):
+        self.queue.put(("contact", (contact_id, name)))
+
+    def mark_read(self, contact_id):
+        self.queue.put(("read", (contact_id,)))
+
+    def set_blocked(self, contact_ids):
+        for contact_id in contact_ids:
+            self.queue.put(("blocked", (contact_id,)))
+
+    def remember_upload(self, sha256, kind, file_id):
+        self.file_ids[(sha256, kind)] = file_id
+        self.queue.put(("upload", (sha256, kind, file_id)))
+
+    def remember_media(self, uid, name, size, used):
+        self.media[uid] = [name, size, used]
+        self.queue.put(("media", (uid, name, size, used)))
+
+    def forget_media(self, uids):
+        for uid in uids:
+            self.media.pop(uid, None)
+            self.queue.put(("forget", (uid,)))
+
+    def append(self, contact_id, from_me, text, media=None, message_id=None, file=None, state=None):
+        """`file` describes a received attachment (see media.incoming_file) so it can be fetched later;
+        `state` is "pending" for a message still waiting in the outbox."""
+        with self.lock:
+            row_id = self.next_id
+            self.next_id += 1
+            message = {
+                "id": row_id, "from_me": from_me, "text": text, "media": media, "message_id": message_id,
+                "file": file, "state": state
+            }
+            self.pending[row_id] = (contact_id, message)
+        self.queue.put((
+            "append",
+            (row_id, contact_id, int(from_me), text, media, message_id, int(time.time()), json.dumps(file) if file else None, state)
+        ))
+        return message
+
+    def set_state(self, row_id, state, message_id=None):
+        """Moves a row through the outbox: "pending", "failed", or None once delivered as `message_id`."""
+        with self.lock:
+            if row_id in self.pending:
+                message = self.pending[row_id][1]
+                message["state"] = state
+                message["message_id"] = message_id or message["message_id"]
+        self.queue.put(("state", (state, message_id, row_id)))
+
+    def outbox(self):
+        """Messages still waiting to be sent as (contact_id, message), oldest first."""
+        rows = self.reader.execute(
+            f"SELECT contact_id, {COLUMNS} FROM messages WHERE state = 'pending' AND deleted = 0 ORDER BY id"
+        ).fetchall()
+        return [(row[0], row_to_message(row[1:])) for row in rows]
+
+    def append_many(self, rows):
+        """Appends (contact_id, from_me, text, media, message_id) rows; returns (contact_id, message) pairs."""
+        return [(row[0], self.append(*row)) for row in rows]
+
+    def delete(self, row_ids):
+        with self.lock:
+            self.pending_deletes.update(row_ids)
+        for row_id in row_ids:
+            self.queue.put(("delete", (row_id,)))
+
+    def page(self, contact_id, limit=HISTORY_PAGE, before=None):
+        """Newest `limit` messages older than row id `before`, oldest first."""
+        return self.read_window(contact_id, limit, before=before or self.next_id)
+
+    def page_after(self, contact_id, after, limit=HISTORY_PAGE):
+        """Oldest `limit` messages newer than row id `after`."""
+        return self.read_window(contact_id, limit, after=after)
+
+    def read_window(self, contact_id, limit, before=None, after=None):
+        newer = after is not None
+        inside = (lambda row_id: row_id > after) if newer else (lambda row_id: row_id < before)
+        # Snapshot the queue before reading: a row committed in between shows up twice, never zero times
+        with self.lock:
+            messages = {
+                row_id: message for row_id, (cid, message) in self.pending.items()
+                if cid == contact_id and inside(row_id)
+            }
+            deleted = set(self.pending_deletes)
+        rows = self.reader.execute(
+            f"SELECT {COLUMNS} FROM messages WHERE contact_id = ? AND deleted = 0 AND "
+            + ("id > ? ORDER BY id LIMIT ?" if newer else "id < ? ORDER BY id DESC LIMIT ?"),
+            (contact_id, after if newer else before, limit + len(deleted))
+        ).fetchall()
+        for row in rows:
+            messages[row[0]] = row_to_message(row)
+
+        ids = sorted((row_id for row_id in messages if row_id not in deleted), reverse=not newer)[:limit]
+        return [messages[row_id] for row_id in sorted(ids)]
+
+    def search(self, text, limit=SEARCH_LIMIT):
+        """Best matching messages of every conversation as (contact_id, row_id, from_me, snippet).
+
+        Safe to call from any thread; results only include rows the writer has committed.
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        return self.searcher.execute(
+            "SELECT m.contact_id, m.id, m.from_me, snippet(messages_fts, 0, '[', ']', '…', 12) "
+            "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+            "WHERE messages_fts MATCH ? AND m.deleted = 0 ORDER BY rank LIMIT ?",
+            (query, limit)
+        ).fetchall()
+
+    @property
+    def index_progress(self):
+        """Share of the pre-existing history already searchable, 1.0 once complete."""
+        return self.fts_built / self.fts_target if self.fts_built < self.fts_target else 1.0
+
+    def index_step(self, conn):
+        upto = min(self.fts_built + INDEX_CHUNK, self.fts_target)
+        with conn:
+            conn.execute(
+                "INSERT INTO messages_fts (rowid, text) SELECT id, text FROM messages WHERE id > ? AND id <= ? AND deleted = 0",
+                (self.fts_built, upto)
+            )
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'fts_built'", (upto,))
+        self.fts_built = upto
+
+    def write_loop(self):
+        conn = connect(self.path)
+        try:
+            self.write_batches(conn)
+        except Exception as e:
+            # Nothing more reaches the disk; the window and close() report it
+            logger.exception("History writer stopped")
+            self.error = f"History writer stopped: {e}"
+        finally:
+            conn.close()
+
+    def write_batches(self, conn):
+        running = True
+        while running:
+            if self.fts_built < self.fts_target and self.queue.empty():
+                # Index old history only while nothing else waits, in chunks short enough not to delay new rows
+                try:
+                    self.index_step(conn)
+                except sqlite3.Error as e:
+                    # The chunk was rolled back; the next start picks up from the same point
+                    self.failed("Indexing old messages failed", e)
+                    self.fts_target = self.fts_built
+                continue
+            ops = [self.queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            # Gather whatever else arrives shortly after, so a burst becomes one commit
+            while len(ops) < FLUSH_BATCH and ops[-1] is not None:
+                try:
+                    ops.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if ops[-1] is None:
+                ops.pop()
+                running = False
+
+            self.commit_batch(conn, ops)
+            with self.lock:
+                for op, args in ops:
+                    if op == "append":
+                        self.pending.pop(args[0], None)
+                    elif op == "delete":
+                        self.pending_deletes.discard(args[0])
+
+    def commit_batch(self, conn, ops):
+        delay = WRITE_RETRY_DELAY
+        while True:
+            try:
+                self.commit(conn, ops)
+                self.error = None
+                return
+            except sqlite3.OperationalError as e:
+                # Disk full, file locked by another program, I/O error: the batch was rolled back whole,
+                # so it can simply be tried again once the cause is gone
+                self.failed(f"Saving {len(ops)} change(s) failed, retrying in {delay:.0f} s", e)
+                if self.close_deadline and time.monotonic() + delay > self.close_deadline:
+                    break
+                time.sleep(delay)
+                delay = min(delay * 2, WRITE_MAX_DELAY)
+            except sqlite3.Error as e:
+                # A change the database refuses would fail every time; save the others without it
+                self.failed(f"Saving {len(ops)} change(s) failed, writing them one at a time", e)
+                break
+        lost = 0
+        for op in ops:
+            try:
+                self.commit(conn, [op])
+            except sqlite3.Error as e:
+                lost += 1
+                logger.error(f"Dropped a history change ({op[0]}): {e}")
+        if lost:
+            self.error = f"{lost} change(s) could not be saved to {self.path}"
+
+    def failed(self, what, e):
+        logger.error(f"{what}: {e}")
+        self.error = f"{what}: {e}"
+
+    def commit(self, conn, ops):
+        with conn:
+            for op, args in ops:
+                if op == "append":
+                    conn.execute(
+                        "INSERT INTO messages (id, contact_id, from_me, text, media, message_id, date, file, state) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        args
+                    )
+                    row_id, contact_id, from_me, text, media = args[:5]
+                    conn.execute(UPSERT_CONTACT_MESSAGE, (contact_id, str(contact_id), preview(text, media), 1 - from_me, row_id))
+                elif op == "delete":
+                    conn.execute("UPDATE messages SET deleted = 1 WHERE id = ?", args)
+                elif op == "contact":
+                    conn.execute("INSERT INTO contacts (id, name) VALUES (?, ?) ON CONFLICT (id) DO UPDATE SET name = excluded.name", args)
+                elif op == "read":
+                    conn.execute("UPDATE contacts SET unread = 0 WHERE id = ?", args)
+                elif op == "blocked":
+                    conn.execute("UPDATE contacts SET blocked = 1 WHERE id = ?", args)
+                elif op == "state":
+                    conn.execute("UPDATE messages SET state = ?, message_id = COALESCE(?, message_id) WHERE id = ?", args)
+                elif op == "media":
+                    conn.execute("INSERT OR REPLACE INTO media (uid, name, size, used) VALUES (?, ?, ?, ?)", args)
+                elif op == "forget":
+                    conn.execute("DELETE FROM media WHERE uid = ?", args)
+                else:
+                    conn.execute("INSERT OR REPLACE INTO uploads (sha256, kind, file_id) VALUES (?, ?, ?)", args)
+
+    def close(self):
+        """Writes what is still queued; returns the error if not everything could be saved, else None."""
+        self.close_deadline = time.monotonic() + CLOSE_TIMEOUT
+        self.queue.put(None)
+        self.writer.join()
+        self.reader.close()
+        self.searcher.close()
+        if self.queue.qsize():
+            # The writer died before getting to these
+            self.error = f"{self.error}; {self.queue.qsize() - 1} queued change(s) were not saved"
+        return self.error
@@ -0,0 +1,120 @@
+import os
+import asyncio
+import hashlib
+from collections import defaultdict
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, InputMediaPhoto, InputMediaVideo
+
+from src.config import ALBUM_SIZE, HASH_CHUNK
+from src.store import HistoryStore
+
+KINDS = {
+    ".jpg": "photo", ".jpeg": "photo", ".png": "photo", ".webp": "photo",
+    ".gif": "animation",
+    # Other containers may come back as a document, so they are sent as one from the start
+    ".mp4": "video",
+}
+LABELS = {"photo": "Photo", "animation": "GIF", "video": "Video", "document": "File"}
+# Telegram only groups photos and videos together; everything else goes one by one
+ALBUM_MEDIA = {"photo": InputMediaPhoto, "video": InputMediaVideo}
+
+class Upload:
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.kind = KINDS.get(os.path.splitext(path)[1].lower(), "document")
+        self.sha256 = None
+
+    @property
+    def label(self):
+        return f"[{LABELS[self.kind]}: {self.name}]"
+
+def sha256_of(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def prepare(paths):
+    """Runs in a worker thread: hashing a large video must not freeze the window."""
+    uploads = [Upload(path) for path in paths]
+    for upload in uploads:
+        upload.sha256 = sha256_of(upload.path)
+    return uploads
+
+def sent_file(message, kind):
+    """(kind, file_id) of what Telegram actually stored, which may be a document instead of the kind sent."""
+    if kind == "photo" and message.photo:
+        return kind, message.photo[-1].file_id
+    if kind != "photo" and getattr(message, kind, None):
+        return kind, getattr(message, kind).file_id
+    if message.document:
+        return "document", message.document.file_id
+    return None, None
+
+class Uploader:
+    """Sends local files, reusing the file_id of anything this bot has uploaded before.
+
+    Consecutive photos and videos go out as albums of up to ALBUM_SIZE. Sends to one contact
+    are serialized to keep their order; different contacts upload at the same time. Every
+    request waits for the limiter first, an album for as many slots as it has files.
+    """
+
+    def __init__(self, bot: Bot, store: HistoryStore, limiter):
+        self.bot = bot
+        self.store = store
+        self.limiter = limiter
+        self.locks = defaultdict(asyncio.Lock)
+
+    def source(self, upload, cached=True):
+        file_id = self.store.file_ids.get((upload.sha256, upload.kind)) if cached else None
+        return file_id or FSInputFile(upload.path, filename=upload.name)
+
+    async def send(self, contact_id, paths, on_sent):
+        """Calls on_sent(upload, message) for every file as soon as it is delivered."""
+        uploads = await asyncio.to_thread(prepare, paths)
+        await self.send_prepared(contact_id, uploads, on_sent)
+
+    async def send_prepared(self, contact_id, uploads, on_sent):
+        async with self.locks[contact_id]:
+            album = []
+            for upload in uploads:
+                if upload.kind in ALBUM_MEDIA:
+                    album.append(upload)
+                    if len(album) < ALBUM_SIZE:
+                        continue
+                    await self.send_group(contact_id, album, on_sent)
+                    album = []
+                else:
+                    await self.send_group(contact_id, album, on_sent)
+                    album = []
+                    await self.send_group(contact_id, [upload], on_sent)
+            await self.send_group(contact_id, album, on_sent)
+
+    async def send_group(self, contact_id, uploads, on_sent):
+        if not uploads:
+            return
+        try:
+            messages = await self.deliver(contact_id, uploads, cached=True)
+        except TelegramBadRequest:
+            # A cached file_id can go stale; upload the files themselves once more
+            messages = await self.deliver(contact_id, uploads, cached=False)
+
+        for upload, message in zip(uploads, messages):
+            # Delivered either way; only a file_id of the kind that was sent can be reused for it
+            kind, file_id = sent_file(message, upload.kind)
+            if kind == upload.kind and self.store.file_ids.get((upload.sha256, kind)) != file_id:
+                self.store.remember_upload(upload.sha256, kind, file_id)
+            on_sent(upload, message)
+
+    async def deliver(self, contact_id, uploads, cached):
+        await self.limiter.acquire(contact_id, len(uploads))
+        if len(uploads) == 1:
+            upload = uploads[0]
+            send = getattr(self.bot, f"send_{upload.kind}")
+            return [await send(contact_id, **{upload.kind: self.source(upload, cached)})]
+        media = [ALBUM_MEDIA[u.kind](media=self.source(u, cached)) for u in uploads]
+        return await self.bot.send_media_group(contact_id, media=media)
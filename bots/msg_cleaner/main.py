@@ -1,62 +1,20 @@
 import asyncio
+import argparse
 import sys
-import locale
-import importlib.util
-import os
-
-def load_strings():
-    lang_code = 'en' 
-
-    for var in ['LANG', 'LC_ALL', 'LC_MESSAGES']:
-        env_lang = os.environ.get(var)
-        if env_lang:
-            lang_code = env_lang.split('.')[0].split('_')[0].lower()
-            if lang_code and lang_code not in ('c', 'posix'):
-                break
-    
-    if lang_code in ('c', 'posix', 'en'):
-        try:
-            sys_lang = locale.getdefaultlocale()[0]
-            if sys_lang:
-                new_lang_code = sys_lang.split('_')[0].lower()
-                if new_lang_code:
-                    lang_code = new_lang_code
-        except Exception:
-            pass
-            
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    lang_file_path = os.path.join(base_dir, 'src', 'language', f'{lang_code}.py')
-    
-    if not os.path.exists(lang_file_path):
-        print(f"⚠️ Language file {lang_code}.py not found. Using English (en).")
-        lang_code = 'en'
-        lang_file_path = os.path.join(base_dir, 'src', 'language', f'{lang_code}.py')
-        
-    spec = importlib.util.spec_from_file_location("STR", lang_file_path)
-    if spec is None:
-        print("❌ Critical error: locale file specification not found.")
-        sys.exit(1)
-        
-    strings_module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(strings_module)
-    
-    return strings_module
-
-STR = load_strings()
 
+from src.strings import STR, load_strings
 from src.client import get_client
 from src.actions import delete_history, get_target_entity, get_entity_title
+from src.batch import Job, load_jobs, run_batch
 
 
 async def get_and_validate_target(client):
     while True:
         try:
-            user_input = input(STR.INPUT_ID).strip()
-            target_id = int(user_input)
-            
-            if target_id > 1000000000000 and target_id > 0:
-                 target_id = -100 * target_id
-            
+            target_id = input(STR.INPUT_ID).strip()
+            if not target_id:
+                raise ValueError(target_id)
+
             print(STR.CHECKING_CHAT)
             entity = await get_target_entity(client, target_id)
             
@@ -72,8 +30,10 @@ async def get_and_validate_target(client):
         except Exception as e:
             print(STR.CRITICAL_ERROR.format(error=STR.ERROR_SEARCH.format(error=e)))
             
-async def main_menu():
+async def main_menu(dry_run: bool = False):
     print(STR.MENU_TITLE)
+    if dry_run:
+        print(STR.DRY_RUN_ACTIVE)
     print(STR.INIT_CLIENT)
     
     client = await get_client()
@@ -93,7 +53,7 @@ async def main_menu():
         choice = input(STR.INPUT_CHOICE).strip()
 
         if choice == '1':
-            await delete_history(client, target_entity) 
+            await delete_history(client, target_entity, dry_run=dry_run)
         elif choice == '2':
             new_entity = await get_and_validate_target(client)
             if new_entity:
@@ -106,9 +66,52 @@ async def main_menu():
         else:
             print(STR.INVALID_INPUT)
 
+async def batch_mode(jobs, dry_run: bool = False):
+    if dry_run:
+        print(STR.DRY_RUN_ACTIVE)
+    print(STR.INIT_CLIENT)
+
+    client = await get_client()
+    try:
+        await run_batch(client, jobs, dry_run)
+    finally:
+        await client.disconnect()
+
+def build_jobs(args):
+    jobs = load_jobs(args.jobs) if args.jobs else []
+    criteria = {
+        "start_phrase": args.start_phrase, "end_phrase": args.end_phrase,
+        "min_id": args.min_id, "max_id": args.max_id,
+        "since": args.since, "until": args.until, "regex": args.regex
+    }
+    jobs += [Job({"chat": chat, **criteria}) for chat in args.chat or []]
+    return jobs
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be deleted and how long it would take, without deleting")
+    batch = parser.add_argument_group("batch mode", "Clean chats without prompts; any of these skips the menu")
+    batch.add_argument("--jobs", help="JSON file with a list of jobs: {\"chat\": ..., criteria...}")
+    batch.add_argument("--chat", action="append", help="Chat id or @username, repeatable; uses the criteria below")
+    batch.add_argument("--start-phrase", help="Text of the newest message to delete")
+    batch.add_argument("--end-phrase", help="Text of the oldest message to delete")
+    batch.add_argument("--min-id", type=int, help="Oldest message id to delete")
+    batch.add_argument("--max-id", type=int, help="Newest message id to delete")
+    batch.add_argument("--since", help="Only messages from this date on (ISO, e.g. 2024-01-31)")
+    batch.add_argument("--until", help="Only messages before this date (ISO)")
+    batch.add_argument("--regex", help="Only messages whose text matches this pattern")
+    args = parser.parse_args()
+
     try:
-        asyncio.run(main_menu())
+        if args.jobs or args.chat:
+            try:
+                jobs = build_jobs(args)
+            except Exception as e:
+                print(STR.JOBS_ERROR.format(error=e))
+                sys.exit(1)
+            asyncio.run(batch_mode(jobs, args.dry_run))
+        else:
+            asyncio.run(main_menu(args.dry_run))
     except KeyboardInterrupt:
         print(STR.STOPPED)
         sys.exit()
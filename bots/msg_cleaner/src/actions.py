@@ -1,27 +1,141 @@
-import asyncio
-import random
 from telethon import TelegramClient
-import sys
+from telethon.errors import FloodWaitError
+
+from src.strings import STR
+from src.config import BATCH_SIZE, MAX_RETRIES, START_DELAY
+from src.rate import RateController
+from src.plan import DeletionPlan
+from src.entities import CACHE, entity_title, parse_target
 
 def get_entity_title(entity):
-    if hasattr(entity, 'first_name') and entity.first_name:
-        return entity.first_name
-    elif hasattr(entity, 'title') and entity.title:
-        return entity.title
-    return str(entity.id)
+    return CACHE.title(entity) or entity_title(entity)
 
-async def get_target_entity(client: TelegramClient, target_id: int):
+async def get_target_entity(client: TelegramClient, target):
+    target = parse_target(target)
+    peer_id = CACHE.find(target)
+    if peer_id is None:
+        try:
+            entity = await client.get_entity(target)
+            CACHE.remember(entity)
+            CACHE.save()
+            return entity
+        except Exception:
+            pass
+        # Unknown to the session too: pick up dialogs that changed since the last crawl
+        await CACHE.refresh(client)
+        peer_id = CACHE.find(target)
+        if peer_id is None:
+            return None
     try:
-        entity = await client.get_entity(target_id)
-        return entity
+        return await client.get_entity(CACHE.input_peer(peer_id))
     except Exception:
-        async for dialog in client.iter_dialogs():
-            if dialog.entity.id == target_id:
-                return dialog.entity
+        return None
+
+class BatchDeleter:
+    """Deletes ids in chunks of BATCH_SIZE under a RateController and counts what actually went away."""
+
+    def __init__(self, client: TelegramClient, entity, controller: RateController, total: int, on_progress=None, verbose=True):
+        self.client = client
+        self.entity = entity
+        self.controller = controller
+        self.total = total
+        self.on_progress = on_progress
+        self.verbose = verbose
+        self.pending = []
+        self.processed = 0
+        self.deleted = 0
+        self.missing = 0
+        self.failed = 0
+
+    @property
+    def progress(self) -> dict:
+        return {"processed": self.processed, "deleted": self.deleted, "missing": self.missing, "failed": self.failed}
+
+    def restore(self, progress: dict):
+        self.processed = progress["processed"]
+        self.deleted = progress["deleted"]
+        self.missing = progress["missing"]
+        self.failed = progress["failed"]
+
+    async def add(self, msg_id: int):
+        self.pending.append(msg_id)
+        if len(self.pending) >= BATCH_SIZE:
+            await self.flush()
+
+    async def flush(self):
+        while self.pending:
+            batch, self.pending = self.pending[:BATCH_SIZE], self.pending[BATCH_SIZE:]
+            await self.delete_batch(batch)
+
+    async def delete_batch(self, ids: list):
+        attempt = 0
+        while True:
+            await self.controller.wait()
+            try:
+                affected = await self.client.delete_messages(self.entity, ids)
+                self.controller.on_success()
+                break
+            except FloodWaitError as e:
+                # Not a failure: the same batch goes again once the wait is over
+                self.controller.on_flood(e.seconds)
+                print(STR.FLOOD_WAIT.format(seconds=e.seconds))
+            except Exception as e:
+                attempt += 1
+                self.controller.on_error()
+                if attempt >= MAX_RETRIES:
+                    self.failed += len(ids)
+                    self.processed += len(ids)
+                    print(STR.BATCH_FAILED.format(first=ids[0], last=ids[-1], attempts=attempt, error=e))
+                    if self.on_progress:
+                        self.on_progress(self.progress)
+                    return
+                print(STR.BATCH_RETRY.format(first=ids[0], last=ids[-1], error=e, attempt=attempt, max_attempts=MAX_RETRIES))
+
+        # pts_count is how many ids the server really removed; the rest were already gone
+        removed = sum(getattr(a, 'pts_count', 0) for a in affected or [])
+        self.deleted += removed
+        self.missing += len(ids) - removed
+        self.processed += len(ids)
+        if self.verbose:
+            print(STR.DELETED_LOG.format(
+                current=self.processed, total=self.total, count=removed,
+                first=ids[0], last=ids[-1], delay=self.controller.delay
+            ))
+        if self.on_progress:
+            self.on_progress(self.progress)
+
+async def find_checkpoint(client: TelegramClient, entity, phrase: str):
+    # Server-side search narrows it down; the substring check keeps the old matching rules
+    async for msg in client.iter_messages(entity, search=phrase, from_user='me'):
+        if msg.message and phrase in msg.message.lower():
+            return msg
     return None
 
-async def delete_history(client: TelegramClient, entity):
-    
+async def run_plan(plan: DeletionPlan, deleter: BatchDeleter):
+    deleter.restore(plan.progress)
+    for msg_id in plan.remaining_ids():
+        await deleter.add(msg_id)
+    await deleter.flush()
+    plan.discard()
+
+async def execute_plan(client: TelegramClient, entity, plan: DeletionPlan):
+    print(STR.START_DELETING)
+    deleter = BatchDeleter(client, entity, RateController(), plan.total, on_progress=plan.save_progress)
+    await run_plan(plan, deleter)
+    print(STR.DONE.format(deleted=deleter.deleted, missing=deleter.missing, failed=deleter.failed))
+
+async def delete_history(client: TelegramClient, entity, dry_run: bool = False):
+    plan = DeletionPlan.load(entity.id)
+    if plan and not dry_run:
+        answer = input(STR.RESUME_PLAN.format(
+            done=plan.progress["processed"], total=plan.total, start_id=plan.start_id, end_id=plan.end_id
+        )).strip().lower()
+        if answer == STR.CONFIRM_YES:
+            await execute_plan(client, entity, plan)
+            return
+        plan.discard()
+        print(STR.PLAN_DISCARDED)
+
     stop_text_newest = input(STR.INPUT_START_PHRASE).strip().lower()
     stop_text_oldest = input(STR.INPUT_END_PHRASE).strip().lower()
 
@@ -29,31 +143,16 @@ async def delete_history(client: TelegramClient, entity):
         print(STR.WARN_EMPTY)
         return
     
-    limit_check = 20000
-    print(STR.MSG_LIMIT_SCAN.format(limit=limit_check))
-    
-    all_messages = await client.get_messages(entity, limit=limit_check)
-    my_messages = [msg for msg in all_messages if msg and msg.out]
-    
-    start_msg = None
-    end_msg = None   
-    
-    for msg in my_messages:
-        if msg.message and stop_text_newest in msg.message.lower():
-            if start_msg is None or msg.id > start_msg.id:
-                start_msg = msg
-    
-    for msg in my_messages:
-        if msg.message and stop_text_oldest in msg.message.lower():
-            if end_msg is None or msg.id > end_msg.id:
-                end_msg = msg
+    print(STR.SEARCHING_CHECKPOINTS)
     
+    start_msg = await find_checkpoint(client, entity, stop_text_newest)
     if not start_msg:
-        print(STR.START_MSG_NOT_FOUND.format(text=stop_text_newest, limit=limit_check))
+        print(STR.START_MSG_NOT_FOUND.format(text=stop_text_newest))
         return
     
+    end_msg = await find_checkpoint(client, entity, stop_text_oldest)
     if not end_msg:
-        print(STR.END_MSG_NOT_FOUND.format(text=stop_text_oldest, limit=limit_check))
+        print(STR.END_MSG_NOT_FOUND.format(text=stop_text_oldest))
         return
 
     if start_msg.id < end_msg.id:
@@ -63,17 +162,22 @@ async def delete_history(client: TelegramClient, entity):
     print(STR.MSG_FOUND.format(text=start_msg.message[:30], msg_id=start_msg.id) + " (Start Checkpoint)")
     print(STR.MSG_FOUND.format(text=end_msg.message[:30], msg_id=end_msg.id) + " (End Checkpoint)")
 
-    to_delete = [
-        msg for msg in my_messages 
-        if end_msg.id <= msg.id <= start_msg.id
-    ]
-    
-    count = len(to_delete)
+    # min_id/max_id are exclusive, so both checkpoints are widened by one to stay in the range
+    bounds = {'from_user': 'me', 'min_id': end_msg.id - 1, 'max_id': start_msg.id + 1}
+    count = (await client.get_messages(entity, limit=0, **bounds)).total
 
     if count == 0:
         print(STR.ZERO_TO_DELETE)
         return
 
+    if dry_run:
+        requests = -(-count // BATCH_SIZE)
+        print(STR.DRY_RUN_SUMMARY.format(
+            count=count, start_id=start_msg.id, end_id=end_msg.id,
+            requests=requests, minutes=max(1, round(requests * START_DELAY / 60))
+        ))
+        return
+
     confirm = input(STR.CONFIRM_DELETE.format(
         count=count, 
         start_id=start_msg.id, 
@@ -84,19 +188,10 @@ async def delete_history(client: TelegramClient, entity):
         print(STR.CANCELLED)
         return
 
-    print(STR.START_DELETING)
-    for index, msg in enumerate(to_delete, start=1):
-        try:
-            await client.delete_messages(entity, msg.id)
-            print(STR.DELETED_LOG.format(current=index, total=count, msg_id=msg.id))
-            
-            await asyncio.sleep(random.uniform(0.3, 0.7))
-            
-            if index % 100 == 0:
-                print(STR.PAUSE_LONG)
-                await asyncio.sleep(5)
-                
-        except Exception as e:
-            print(STR.DELETE_ERROR.format(msg_id=msg.id, error=e))
-
-    print(STR.DONE)
\ No newline at end of file
+    print(STR.BUILDING_PLAN)
+    plan = await DeletionPlan.create(
+        entity.id, get_entity_title(entity), client.iter_messages(entity, **bounds),
+        {"start_phrase": stop_text_newest, "end_phrase": stop_text_oldest}
+    )
+    print(STR.PLAN_SAVED.format(count=plan.total, path=plan.header_path))
+    await execute_plan(client, entity, plan)
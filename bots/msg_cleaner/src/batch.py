@@ -0,0 +1,179 @@
+import re
+import json
+import asyncio
+from datetime import datetime, timezone
+from telethon import TelegramClient
+
+from src.strings import STR
+from src.config import BATCH_SIZE, START_DELAY, MAX_PARALLEL_JOBS, REPORT_INTERVAL
+from src.rate import RateController
+from src.plan import DeletionPlan
+from src.actions import BatchDeleter, find_checkpoint, get_target_entity, get_entity_title, run_plan
+from src.entities import parse_target
+
+CRITERIA = ("start_phrase", "end_phrase", "min_id", "max_id", "since", "until", "regex")
+
+def parse_date(value):
+    if not value:
+        return None
+    date = datetime.fromisoformat(value)
+    return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+
+class Job:
+    """One chat plus the criteria picking which of my messages in it get deleted.
+
+    Checkpoints and min_id/max_id narrow the id range (both inclusive), since/until the dates,
+    and regex is matched against the text of every message left in the range.
+    """
+
+    def __init__(self, spec: dict):
+        if not any(spec.get(key) for key in CRITERIA):
+            raise ValueError(STR.JOB_NO_CRITERIA.format(chat=spec.get("chat")))
+        self.chat = parse_target(spec["chat"])
+        self.start_phrase = (spec.get("start_phrase") or "").strip().lower()
+        self.end_phrase = (spec.get("end_phrase") or "").strip().lower()
+        self.min_id = spec.get("min_id")
+        self.max_id = spec.get("max_id")
+        self.since = parse_date(spec.get("since"))
+        self.until = parse_date(spec.get("until"))
+        self.regex = re.compile(spec["regex"]) if spec.get("regex") else None
+        # As stored in a plan header, to tell whether an unfinished plan for the chat is this job's
+        self.criteria = {key: value for key, value in {
+            "start_phrase": self.start_phrase or None, "end_phrase": self.end_phrase or None,
+            "min_id": self.min_id, "max_id": self.max_id,
+            "since": self.since.isoformat() if self.since else None,
+            "until": self.until.isoformat() if self.until else None,
+            "regex": spec.get("regex") or None,
+        }.items() if value is not None}
+
+        self.title = str(self.chat)
+        self.status = "queued"
+        self.error = None
+        self.selected = 0
+        self.deleter = None
+
+def load_jobs(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    specs = data.get("jobs", []) if isinstance(data, dict) else data
+    return [Job(spec) for spec in specs]
+
+async def resolve_bounds(client: TelegramClient, entity, job: Job) -> dict:
+    low, high = job.min_id, job.max_id
+    if job.start_phrase:
+        msg = await find_checkpoint(client, entity, job.start_phrase)
+        if not msg:
+            raise LookupError(STR.START_MSG_NOT_FOUND.format(text=job.start_phrase))
+        high = msg.id if high is None else min(high, msg.id)
+    if job.end_phrase:
+        msg = await find_checkpoint(client, entity, job.end_phrase)
+        if not msg:
+            raise LookupError(STR.END_MSG_NOT_FOUND.format(text=job.end_phrase))
+        low = msg.id if low is None else max(low, msg.id)
+    if low is not None and high is not None and high < low:
+        raise ValueError(STR.RANGE_ERROR.format(start_id=high, end_id=low))
+
+    # min_id/max_id are exclusive, so both ends are widened by one to stay in the range
+    bounds = {'from_user': 'me'}
+    if low is not None:
+        bounds['min_id'] = low - 1
+    if high is not None:
+        bounds['max_id'] = high + 1
+    if job.until:
+        bounds['offset_date'] = job.until
+    return bounds
+
+async def select_messages(client: TelegramClient, entity, job: Job, bounds: dict):
+    async for msg in client.iter_messages(entity, **bounds):
+        if job.since and msg.date < job.since:
+            # Newest first, so everything after this is older still
+            break
+        if job.regex and not job.regex.search(msg.message or ""):
+            continue
+        yield msg
+
+async def run_job(client: TelegramClient, job: Job, controller: RateController, semaphore: asyncio.Semaphore, claimed: set, dry_run: bool):
+    async with semaphore:
+        try:
+            entity = await get_target_entity(client, job.chat)
+            if not entity:
+                raise LookupError(STR.JOB_CHAT_NOT_FOUND)
+            job.title = get_entity_title(entity)
+            # Plans are journaled per chat, so two jobs must not clean the same one
+            if entity.id in claimed:
+                raise ValueError(STR.JOB_DUPLICATE_CHAT)
+            claimed.add(entity.id)
+
+            plan = None if dry_run else DeletionPlan.load(entity.id)
+            if plan and plan.criteria != job.criteria:
+                # Left by another run with other criteria; deleting its range silently would be wrong
+                raise ValueError(STR.JOB_PLAN_MISMATCH.format(path=plan.header_path))
+            if plan:
+                print(STR.JOB_RESUMING.format(title=job.title, done=plan.progress["processed"], total=plan.total))
+            else:
+                job.status = "listing"
+                bounds = await resolve_bounds(client, entity, job)
+                messages = select_messages(client, entity, job, bounds)
+                if dry_run:
+                    async for _ in messages:
+                        job.selected += 1
+                    job.status = "done"
+                    print(STR.JOB_DRY_RUN.format(title=job.title, count=job.selected))
+                    return
+                plan = await DeletionPlan.create(entity.id, job.title, messages, job.criteria)
+                print(STR.JOB_PLANNED.format(title=job.title, count=plan.total))
+
+            job.selected = plan.total
+            job.status = "deleting"
+            job.deleter = BatchDeleter(client, entity, controller, plan.total, on_progress=plan.save_progress, verbose=False)
+            await run_plan(plan, job.deleter)
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(STR.JOB_FAILED.format(title=job.title, error=e))
+
+def print_progress(jobs: list, controller: RateController):
+    deleters = [job.deleter for job in jobs if job.deleter]
+    print(STR.BATCH_PROGRESS.format(
+        done=sum(job.status in ("done", "failed") for job in jobs), jobs=len(jobs),
+        processed=sum(d.processed for d in deleters), total=sum(job.selected for job in jobs),
+        deleted=sum(d.deleted for d in deleters), missing=sum(d.missing for d in deleters),
+        failed=sum(d.failed for d in deleters), delay=controller.delay
+    ))
+
+async def report(jobs: list, controller: RateController):
+    while True:
+        await asyncio.sleep(REPORT_INTERVAL)
+        print_progress(jobs, controller)
+
+async def run_batch(client: TelegramClient, jobs: list, dry_run: bool = False):
+    print(STR.BATCH_START.format(jobs=len(jobs), parallel=MAX_PARALLEL_JOBS))
+    # One controller for every job: the flood limits are per account, not per chat
+    controller = RateController()
+    semaphore = asyncio.Semaphore(MAX_PARALLEL_JOBS)
+    claimed = set()
+
+    reporter = asyncio.create_task(report(jobs, controller))
+    try:
+        await asyncio.gather(*(run_job(client, job, controller, semaphore, claimed, dry_run) for job in jobs))
+    finally:
+        reporter.cancel()
+
+    if dry_run:
+        requests = sum(-(-job.selected // BATCH_SIZE) for job in jobs)
+        print(STR.DRY_RUN_BATCH.format(
+            count=sum(job.selected for job in jobs), jobs=sum(job.status == "done" for job in jobs),
+            requests=requests, minutes=max(1, round(requests * START_DELAY / 60))
+        ))
+        return
+
+    print_progress(jobs, controller)
+    print(STR.BATCH_SUMMARY)
+    for job in jobs:
+        d = job.deleter
+        print(STR.BATCH_SUMMARY_LINE.format(
+            mark="✅" if job.status == "done" else "❌", title=job.title,
+            deleted=d.deleted if d else 0, missing=d.missing if d else 0, failed=d.failed if d else 0,
+            error=f" ({job.error})" if job.error else ""
+        ))
@@ -11,3 +11,19 @@ if not API_ID or not API_HASH:
     raise ValueError("❌ Error: API_ID or API_HASH not found in .env file")
 
 API_ID = int(API_ID)
+
+# Deletion pacing
+BATCH_SIZE = 100 # Telegram accepts up to 100 ids per delete_messages call
+START_DELAY = 1.0 # Initial pause between delete calls
+MIN_DELAY = 0.3 # Fastest pace the controller is allowed to reach
+MAX_DELAY = 30.0 # Slowest pace after repeated flood waits
+DELAY_STEP = 0.1 # Additive speed-up after every successful call
+BACKOFF_FACTOR = 2.0 # Multiplicative slow-down after a flood wait or error
+MAX_RETRIES = 3 # Attempts for a batch failing with non-flood errors
+
+PLANS_DIR = "plans" # Journals of unfinished cleanups, one per chat
+ENTITY_CACHE_FILE = "entities.json" # Index of known chats, so lookups never scan all dialogs
+
+# Batch mode
+MAX_PARALLEL_JOBS = 4 # Chats listed/cleaned at the same time; deletions still share one rate budget
+REPORT_INTERVAL = 10 # Seconds between consolidated progress lines
@@ -0,0 +1,117 @@
+import os
+import json
+from telethon import TelegramClient, utils
+from telethon.tl.types import User, Chat, InputPeerUser, InputPeerChat, InputPeerChannel
+
+from src.strings import STR
+from src.config import ENTITY_CACHE_FILE
+
+def entity_title(entity):
+    if hasattr(entity, 'first_name') and entity.first_name:
+        return entity.first_name
+    elif hasattr(entity, 'title') and entity.title:
+        return entity.title
+    return str(entity.id)
+
+def parse_target(value):
+    """Numeric input becomes an id, anything else is treated as a username."""
+    if isinstance(value, str):
+        value = value.strip()
+        if value.lstrip('-').isdigit():
+            return int(value)
+    return value
+
+class EntityCache:
+    """On-disk index of marked peer id -> type, access hash, title and username.
+
+    Marked ids are Telegram's own: users as is, basic groups negated, channels prefixed with -100.
+    It is filled from one crawl of the dialogs; later refreshes stop at the first dialog
+    with no activity since the previous crawl.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.peers = {}
+        self.usernames = {}
+        self.synced_at = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.synced_at = data.get("synced_at", 0)
+            for peer_id, entry in data.get("peers", {}).items():
+                self.add(int(peer_id), entry)
+
+    def add(self, peer_id: int, entry: dict):
+        self.peers[peer_id] = entry
+        if entry.get("username"):
+            self.usernames[entry["username"]] = peer_id
+
+    def remember(self, entity):
+        if isinstance(entity, User):
+            kind = "user"
+        elif isinstance(entity, Chat):
+            kind = "chat"
+        else:
+            kind = "channel"
+        username = getattr(entity, 'username', None)
+        self.add(utils.get_peer_id(entity), {
+            "type": kind,
+            "access_hash": getattr(entity, 'access_hash', None),
+            "title": entity_title(entity),
+            "username": username.lower() if username else None
+        })
+
+    def find(self, target):
+        """Returns the marked id for an id in any form or a username, or None."""
+        if isinstance(target, str):
+            return self.usernames.get(target.lstrip('@').lower())
+        if target in self.peers:
+            return target
+        if target > 0:
+            # A bare id may be a user, a channel without its -100 prefix or a basic group
+            for peer_id in (int(f"-100{target}"), -target):
+                if peer_id in self.peers:
+                    return peer_id
+        return None
+
+    def input_peer(self, peer_id: int):
+        entry = self.peers[peer_id]
+        real_id, _ = utils.resolve_id(peer_id)
+        if entry["type"] == "user":
+            return InputPeerUser(real_id, entry["access_hash"] or 0)
+        if entry["type"] == "chat":
+            return InputPeerChat(real_id)
+        return InputPeerChannel(real_id, entry["access_hash"] or 0)
+
+    def title(self, entity):
+        try:
+            entry = self.peers.get(utils.get_peer_id(entity))
+        except TypeError:
+            return None
+        return entry["title"] if entry else None
+
+    async def refresh(self, client: TelegramClient):
+        print(STR.REFRESHING_DIALOGS)
+        newest = self.synced_at
+        async for dialog in client.iter_dialogs():
+            self.remember(dialog.entity)
+            if not dialog.date:
+                continue
+            stamp = int(dialog.date.timestamp())
+            newest = max(newest, stamp)
+            # Dialogs come most recently active first; pinned ones are listed ahead of that order
+            if stamp <= self.synced_at and not dialog.pinned:
+                break
+        self.synced_at = newest
+        self.save()
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "synced_at": self.synced_at,
+                "peers": {str(peer_id): entry for peer_id, entry in self.peers.items()}
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+CACHE = EntityCache(ENTITY_CACHE_FILE)
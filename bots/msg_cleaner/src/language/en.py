@@ -2,7 +2,7 @@ MENU_TITLE = "\n--- Telegram Msg Cleaner ---"
 INIT_CLIENT = "Initializing client..."
 WELCOME = "👋 Hello, {name}!"
 
-INPUT_ID = "Enter ID (user or channel): "
+INPUT_ID = "Enter ID or @username (user, group or channel): "
 CHECKING_CHAT = "🔍 Checking chat..."
 CHAT_CONFIRMED = "✅ Chat successfully found: {title} (ID: {chat_id})."
 CHAT_NOT_FOUND_RETRY = "❌ Chat with ID {chat_id} not found. Try again."
@@ -24,12 +24,12 @@ ERROR_SEARCH = "Error searching: {error}"
 INPUT_START_PHRASE = "\n 1 Enter phrase from the NEWEST message: "
 INPUT_END_PHRASE = " 2 Enter phrase from the OLDEST message: "
 WARN_EMPTY = "⚠️ Empty input."
-MSG_LIMIT_SCAN = "⏳ Scanning your last {limit} messages..."
+SEARCHING_CHECKPOINTS = "⏳ Searching your messages for the checkpoints..."
 
 MSG_FOUND = "✅ Message found: \"{text}...\" (ID: {msg_id})"
 
-START_MSG_NOT_FOUND = "❌ Start Checkpoint message (new) with text '{text}' not found in last {limit}."
-END_MSG_NOT_FOUND = "❌ End Checkpoint message (old) with text '{text}' not found in last {limit}."
+START_MSG_NOT_FOUND = "❌ Start Checkpoint message (new) with text '{text}' not found."
+END_MSG_NOT_FOUND = "❌ End Checkpoint message (old) with text '{text}' not found."
 RANGE_ERROR = "⚠️ Range error: Start ID ({start_id}) must be NEWER than End ID ({end_id}). Check that you entered phrases in correct order."
 ZERO_TO_DELETE = "🤷‍♂️ Range set, but there are no outgoing messages to delete."
 
@@ -37,7 +37,31 @@ CONFIRM_DELETE = "🗑️ Found {count} messages to delete.\nStart (New) ID: {st
 CANCELLED = "🚫 Cancelled."
 CONFIRM_YES = "yes"
 START_DELETING = "\n🚀 Starting deletion..."
-DELETED_LOG = "[{current}/{total}] Deleted ID: {msg_id}"
-PAUSE_LONG = "☕ 5-second pause for safety..."
-DELETE_ERROR = "⚠️ Error with ID {msg_id}: {error}"
-DONE = "\n🏁 Cleanup complete!"
+DELETED_LOG = "[{current}/{total}] Deleted {count} messages (IDs {first}–{last}), next pause {delay:.1f}s"
+FLOOD_WAIT = "⏳ Telegram asked to wait {seconds}s, slowing down..."
+BATCH_RETRY = "⚠️ Batch {first}–{last} failed: {error}. Retry {attempt}/{max_attempts}..."
+BATCH_FAILED = "❌ Batch {first}–{last} skipped after {attempts} attempts: {error}"
+DONE = "\n🏁 Cleanup complete! Deleted: {deleted}, already gone: {missing}, failed: {failed}."
+
+BUILDING_PLAN = "📋 Listing messages in range..."
+PLAN_SAVED = "📝 Deletion plan for {count} messages saved to {path}"
+RESUME_PLAN = "♻️ Unfinished cleanup found for this chat: {done}/{total} processed (IDs {end_id}–{start_id}).\nType 'yes' to resume it, anything else to discard it: "
+PLAN_DISCARDED = "🗑️ Unfinished plan discarded."
+DRY_RUN_SUMMARY = "🧪 Dry run: {count} messages (IDs {end_id}–{start_id}) would be deleted in {requests} requests, ~{minutes} min. Nothing was deleted."
+DRY_RUN_ACTIVE = "🧪 Dry-run mode: nothing will be deleted."
+
+BATCH_START = "📦 Running {jobs} jobs, up to {parallel} at a time, under one shared rate limit..."
+JOBS_ERROR = "❌ Invalid jobs: {error}"
+JOB_NO_CRITERIA = "job for chat {chat} has no criteria (phrases, id range, dates or regex)"
+JOB_CHAT_NOT_FOUND = "chat not found"
+JOB_DUPLICATE_CHAT = "another job already cleans this chat"
+JOB_FAILED = "❌ [{title}] {error}"
+JOB_PLAN_MISMATCH = "an unfinished plan with different criteria exists ({path}); resume or discard it in interactive mode first"
+JOB_RESUMING = "♻️ [{title}] Resuming unfinished plan ({done}/{total} processed)"
+JOB_PLANNED = "📝 [{title}] {count} messages selected"
+JOB_DRY_RUN = "🧪 [{title}] {count} messages would be deleted"
+BATCH_PROGRESS = "📊 Jobs {done}/{jobs} | Processed {processed}/{total} | Deleted {deleted} | Already gone {missing} | Failed {failed} | Pause {delay:.2f}s"
+BATCH_SUMMARY = "\n🏁 Batch complete:"
+BATCH_SUMMARY_LINE = "  {mark} {title}: deleted {deleted}, already gone {missing}, failed {failed}{error}"
+DRY_RUN_BATCH = "🧪 Dry run: {count} messages in {jobs} chats would be deleted in {requests} requests, ~{minutes} min. Nothing was deleted."
+REFRESHING_DIALOGS = "🗂️ Refreshing the chat index..."
@@ -2,7 +2,7 @@ MENU_TITLE = "\n--- Telegram Msg Cleaner ---"
 INIT_CLIENT = "Inicializando cliente..."
 WELCOME = "👋 ¡Hola, {name}!"
 
-INPUT_ID = "Introduce el ID (usuario o canal): "
+INPUT_ID = "Introduce el ID o @usuario (usuario, grupo o canal): "
 CHECKING_CHAT = "🔍 Comprobando chat..."
 CHAT_CONFIRMED = "✅ Chat encontrado con éxito: {title} (ID: {chat_id})."
 CHAT_NOT_FOUND_RETRY = "❌ No se encontró el chat con ID {chat_id}. Inténtalo de nuevo."
@@ -24,12 +24,12 @@ ERROR_SEARCH = "Error al buscar: {error}"
 INPUT_START_PHRASE = "\n 1 Introduce la frase del mensaje MÁS RECIENTE: "
 INPUT_END_PHRASE = " 2 Introduce la frase del mensaje MÁS ANTIGUO: "
 WARN_EMPTY = "⚠️ Entrada vacía."
-MSG_LIMIT_SCAN = "⏳ Escaneando tus últimos {limit} mensajes..."
+SEARCHING_CHECKPOINTS = "⏳ Buscando los checkpoints en tus mensajes..."
 
 MSG_FOUND = "✅ Mensaje encontrado: \"{text}...\" (ID: {msg_id})"
 
-START_MSG_NOT_FOUND = "❌ Mensaje Start Checkpoint (nuevo) con texto '{text}' no encontrado en los últimos {limit}."
-END_MSG_NOT_FOUND = "❌ Mensaje End Checkpoint (antiguo) con texto '{text}' no encontrado en los últimos {limit}."
+START_MSG_NOT_FOUND = "❌ Mensaje Start Checkpoint (nuevo) con texto '{text}' no encontrado."
+END_MSG_NOT_FOUND = "❌ Mensaje End Checkpoint (antiguo) con texto '{text}' no encontrado."
 RANGE_ERROR = "⚠️ Error de rango: Start ID ({start_id}) debe ser MÁS RECIENTE que End ID ({end_id}). Verifica el orden de las frases."
 ZERO_TO_DELETE = "🤷‍♂️ Rango establecido, pero no hay mensajes salientes para eliminar."
 
@@ -37,7 +37,31 @@ CONFIRM_DELETE = "🗑️ Se encontraron {count} mensajes para eliminar.\nInicio
 CANCELLED = "🚫 Cancelado."
 CONFIRM_YES = "sí"
 START_DELETING = "\n🚀 Comenzando eliminación..."
-DELETED_LOG = "[{current}/{total}] Eliminado ID: {msg_id}"
-PAUSE_LONG = "☕ Pausa de 5 segundos por seguridad..."
-DELETE_ERROR = "⚠️ Error con ID {msg_id}: {error}"
-DONE = "\n🏁 Limpieza completada!"
+DELETED_LOG = "[{current}/{total}] Eliminados {count} mensajes (IDs {first}–{last}), próxima pausa {delay:.1f}s"
+FLOOD_WAIT = "⏳ Telegram pidió esperar {seconds}s, reduciendo la velocidad..."
+BATCH_RETRY = "⚠️ El lote {first}–{last} falló: {error}. Reintento {attempt}/{max_attempts}..."
+BATCH_FAILED = "❌ Lote {first}–{last} omitido tras {attempts} intentos: {error}"
+DONE = "\n🏁 ¡Limpieza completada! Eliminados: {deleted}, ya no existían: {missing}, fallidos: {failed}."
+
+BUILDING_PLAN = "📋 Listando mensajes del rango..."
+PLAN_SAVED = "📝 Plan de eliminación de {count} mensajes guardado en {path}"
+RESUME_PLAN = "♻️ Hay una limpieza sin terminar en este chat: {done}/{total} procesados (IDs {end_id}–{start_id}).\nEscribe 'sí' para reanudarla, cualquier otra cosa para descartarla: "
+PLAN_DISCARDED = "🗑️ Plan sin terminar descartado."
+DRY_RUN_SUMMARY = "🧪 Simulación: se eliminarían {count} mensajes (IDs {end_id}–{start_id}) en {requests} solicitudes, ~{minutes} min. No se eliminó nada."
+DRY_RUN_ACTIVE = "🧪 Modo simulación: no se eliminará nada."
+
+BATCH_START = "📦 Ejecutando {jobs} tareas, hasta {parallel} a la vez, con un único límite de velocidad compartido..."
+JOBS_ERROR = "❌ Tareas no válidas: {error}"
+JOB_NO_CRITERIA = "la tarea del chat {chat} no tiene criterios (frases, rango de IDs, fechas o regex)"
+JOB_CHAT_NOT_FOUND = "chat no encontrado"
+JOB_DUPLICATE_CHAT = "otra tarea ya limpia este chat"
+JOB_FAILED = "❌ [{title}] {error}"
+JOB_PLAN_MISMATCH = "existe un plan sin terminar con otros criterios ({path}); reanúdelo o descártelo primero en modo interactivo"
+JOB_RESUMING = "♻️ [{title}] Reanudando plan sin terminar ({done}/{total} procesados)"
+JOB_PLANNED = "📝 [{title}] {count} mensajes seleccionados"
+JOB_DRY_RUN = "🧪 [{title}] se eliminarían {count} mensajes"
+BATCH_PROGRESS = "📊 Tareas {done}/{jobs} | Procesados {processed}/{total} | Eliminados {deleted} | Ya no existían {missing} | Fallidos {failed} | Pausa {delay:.2f}s"
+BATCH_SUMMARY = "\n🏁 Lote completado:"
+BATCH_SUMMARY_LINE = "  {mark} {title}: eliminados {deleted}, ya no existían {missing}, fallidos {failed}{error}"
+DRY_RUN_BATCH = "🧪 Simulación: se eliminarían {count} mensajes en {jobs} chats con {requests} solicitudes, ~{minutes} min. No se eliminó nada."
+REFRESHING_DIALOGS = "🗂️ Actualizando el índice de chats..."
@@ -2,7 +2,7 @@ MENU_TITLE = "\n--- Telegram Msg Cleaner ---"
 INIT_CLIENT = "正在初始化客户端..."
 WELCOME = "👋 你好, {name}!"
 
-INPUT_ID = "输入ID（用户或频道）："
+INPUT_ID = "输入ID或@用户名（用户、群组或频道）："
 CHECKING_CHAT = "🔍 正在检查聊天..."
 CHAT_CONFIRMED = "✅ 聊天成功找到: {title} (ID: {chat_id})。"
 CHAT_NOT_FOUND_RETRY = "❌ 未找到ID为 {chat_id} 的聊天。请重试。"
@@ -24,12 +24,12 @@ ERROR_SEARCH = "搜索错误: {error}"
 INPUT_START_PHRASE = "\n 1 输入最新消息中的短语："
 INPUT_END_PHRASE = " 2 输入最旧消息中的短语："
 WARN_EMPTY = "⚠️ 输入为空。"
-MSG_LIMIT_SCAN = "⏳ 正在扫描您最近的 {limit} 条消息..."
+SEARCHING_CHECKPOINTS = "⏳ 正在您的消息中搜索检查点..."
 
 MSG_FOUND = "✅ 找到消息: \"{text}...\" (ID: {msg_id})"
 
-START_MSG_NOT_FOUND = "❌ 未在最近 {limit} 条消息中找到 Start Checkpoint 消息（新）: '{text}'。"
-END_MSG_NOT_FOUND = "❌ 未在最近 {limit} 条消息中找到 End Checkpoint 消息（旧）: '{text}'。"
+START_MSG_NOT_FOUND = "❌ 未找到 Start Checkpoint 消息（新）: '{text}'。"
+END_MSG_NOT_FOUND = "❌ 未找到 End Checkpoint 消息（旧）: '{text}'。"
 RANGE_ERROR = "⚠️ 范围错误: Start ID ({start_id}) 必须比 End ID ({end_id}) 新。请检查短语顺序。"
 ZERO_TO_DELETE = "🤷‍♂️ 已设置范围，但没有可删除的外发消息。"
 
@@ -37,7 +37,31 @@ CONFIRM_DELETE = "🗑️ 找到 {count} 条消息可删除。\n起始 (新) ID:
 CANCELLED = "🚫 已取消。"
 CONFIRM_YES = "是"
 START_DELETING = "\n🚀 开始删除..."
-DELETED_LOG = "[{current}/{total}] 已删除 ID: {msg_id}"
-PAUSE_LONG = "☕ 为安全暂停5秒..."
-DELETE_ERROR = "⚠️ ID {msg_id} 出错: {error}"
-DONE = "\n🏁 清理完成！"
+DELETED_LOG = "[{current}/{total}] 已删除 {count} 条消息 (ID {first}–{last})，下次暂停 {delay:.1f} 秒"
+FLOOD_WAIT = "⏳ Telegram 要求等待 {seconds} 秒，正在减速..."
+BATCH_RETRY = "⚠️ 批次 {first}–{last} 失败: {error}。重试 {attempt}/{max_attempts}..."
+BATCH_FAILED = "❌ 批次 {first}–{last} 在 {attempts} 次尝试后跳过: {error}"
+DONE = "\n🏁 清理完成！已删除: {deleted}，已不存在: {missing}，失败: {failed}。"
+
+BUILDING_PLAN = "📋 正在列出范围内的消息..."
+PLAN_SAVED = "📝 {count} 条消息的删除计划已保存到 {path}"
+RESUME_PLAN = "♻️ 此聊天有未完成的清理: 已处理 {done}/{total} (ID {end_id}–{start_id})。\n输入 '是' 继续，输入其他内容放弃: "
+PLAN_DISCARDED = "🗑️ 已放弃未完成的计划。"
+DRY_RUN_SUMMARY = "🧪 演练: 将在 {requests} 次请求中删除 {count} 条消息 (ID {end_id}–{start_id})，约 {minutes} 分钟。未删除任何内容。"
+DRY_RUN_ACTIVE = "🧪 演练模式: 不会删除任何内容。"
+
+BATCH_START = "📦 正在运行 {jobs} 个任务，最多同时 {parallel} 个，共用一个速率限制..."
+JOBS_ERROR = "❌ 任务无效: {error}"
+JOB_NO_CRITERIA = "聊天 {chat} 的任务没有条件 (短语、ID 范围、日期或正则)"
+JOB_CHAT_NOT_FOUND = "未找到聊天"
+JOB_DUPLICATE_CHAT = "另一个任务已在清理此聊天"
+JOB_FAILED = "❌ [{title}] {error}"
+JOB_PLAN_MISMATCH = "存在使用不同条件的未完成计划 ({path})；请先在交互模式中继续或放弃它"
+JOB_RESUMING = "♻️ [{title}] 继续未完成的计划 (已处理 {done}/{total})"
+JOB_PLANNED = "📝 [{title}] 已选中 {count} 条消息"
+JOB_DRY_RUN = "🧪 [{title}] 将删除 {count} 条消息"
+BATCH_PROGRESS = "📊 任务 {done}/{jobs} | 已处理 {processed}/{total} | 已删除 {deleted} | 已不存在 {missing} | 失败 {failed} | 间隔 {delay:.2f}秒"
+BATCH_SUMMARY = "\n🏁 批处理完成:"
+BATCH_SUMMARY_LINE = "  {mark} {title}: 已删除 {deleted}，已不存在 {missing}，失败 {failed}{error}"
+DRY_RUN_BATCH = "🧪 演练: 将在 {requests} 次请求中删除 {jobs} 个聊天的 {count} 条消息，约 {minutes} 分钟。未删除任何内容。"
+REFRESHING_DIALOGS = "🗂️ 正在更新聊天索引..."
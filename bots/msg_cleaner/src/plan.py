@@ -0,0 +1,83 @@
+import os
+import json
+import time
+
+from src.config import PLANS_DIR
+
+class DeletionPlan:
+    """Journal of one range cleanup.
+
+    chat_<id>.json holds the chat, checkpoint range and the criteria that selected the messages,
+    chat_<id>.ids every id to delete
+    (one per line, newest first) and chat_<id>.progress how many of them were processed,
+    rewritten after each batch so an interrupted cleanup resumes where it stopped.
+    """
+
+    def __init__(self, chat_id: int):
+        base = os.path.join(PLANS_DIR, f"chat_{chat_id}")
+        self.header_path = base + ".json"
+        self.ids_path = base + ".ids"
+        self.progress_path = base + ".progress"
+        self.chat_id = chat_id
+        self.title = ""
+        self.start_id = self.end_id = self.total = 0
+        self.criteria = {}
+        self.progress = {"processed": 0, "deleted": 0, "missing": 0, "failed": 0}
+
+    @classmethod
+    def load(cls, chat_id: int):
+        plan = cls(chat_id)
+        if not os.path.exists(plan.header_path):
+            return None
+        with open(plan.header_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        plan.title, plan.start_id, plan.end_id, plan.total = header["title"], header["start_id"], header["end_id"], header["total"]
+        plan.criteria = header.get("criteria", {})
+        if os.path.exists(plan.progress_path):
+            with open(plan.progress_path, "r", encoding="utf-8") as f:
+                plan.progress.update(json.load(f))
+        return plan
+
+    @classmethod
+    async def create(cls, chat_id: int, title: str, messages, criteria: dict):
+        """Streams the selected messages (newest first) into the journal.
+
+        `criteria` records how they were chosen, so a later run only resumes a plan it would have made itself.
+        """
+        os.makedirs(PLANS_DIR, exist_ok=True)
+        plan = cls(chat_id)
+        plan.title = title
+        plan.criteria = {key: value for key, value in criteria.items() if value is not None}
+        with open(plan.ids_path, "w", encoding="utf-8") as f:
+            async for msg in messages:
+                f.write(f"{msg.id}\n")
+                plan.start_id = plan.start_id or msg.id
+                plan.end_id = msg.id
+                plan.total += 1
+
+        # The header is written last: a plan without one never finished listing and is ignored
+        with open(plan.header_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "chat_id": plan.chat_id, "title": title, "start_id": plan.start_id, "end_id": plan.end_id,
+                "total": plan.total, "criteria": plan.criteria, "created": int(time.time())
+            }, f, ensure_ascii=False, indent=2)
+        plan.save_progress(plan.progress)
+        return plan
+
+    def remaining_ids(self):
+        with open(self.ids_path, "r", encoding="utf-8") as f:
+            for index, line in enumerate(f):
+                if index >= self.progress["processed"]:
+                    yield int(line)
+
+    def save_progress(self, progress: dict):
+        self.progress = dict(progress)
+        tmp_path = self.progress_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.progress, f)
+        os.replace(tmp_path, self.progress_path)
+
+    def discard(self):
+        for path in (self.header_path, self.ids_path, self.progress_path):
+            if os.path.exists(path):
+                os.remove(path)
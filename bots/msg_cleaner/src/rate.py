@@ -0,0 +1,29 @@
+import asyncio
+import time
+from src.config import START_DELAY, MIN_DELAY, MAX_DELAY, DELAY_STEP, BACKOFF_FACTOR
+
+class RateController:
+    """AIMD pacing: the pause shrinks additively while calls succeed and grows multiplicatively on flood waits."""
+
+    def __init__(self, delay=START_DELAY):
+        self.delay = delay
+        self.next_call = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            pause = self.next_call - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            self.next_call = time.monotonic() + self.delay
+
+    def on_success(self):
+        self.delay = max(MIN_DELAY, self.delay - DELAY_STEP)
+
+    def on_flood(self, seconds: int):
+        self.delay = min(MAX_DELAY, self.delay * BACKOFF_FACTOR)
+        # Nobody may call again before the server-imposed wait is over
+        self.next_call = max(self.next_call, time.monotonic() + seconds)
+
+    def on_error(self):
+        self.delay = min(MAX_DELAY, self.delay * BACKOFF_FACTOR)
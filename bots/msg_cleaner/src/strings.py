@@ -0,0 +1,44 @@
+import sys
+import locale
+import importlib.util
+import os
+
+def load_strings():
+    lang_code = 'en' 
+
+    for var in ['LANG', 'LC_ALL', 'LC_MESSAGES']:
+        env_lang = os.environ.get(var)
+        if env_lang:
+            lang_code = env_lang.split('.')[0].split('_')[0].lower()
+            if lang_code and lang_code not in ('c', 'posix'):
+                break
+    
+    if lang_code in ('c', 'posix', 'en'):
+        try:
+            sys_lang = locale.getdefaultlocale()[0]
+            if sys_lang:
+                new_lang_code = sys_lang.split('_')[0].lower()
+                if new_lang_code:
+                    lang_code = new_lang_code
+        except Exception:
+            pass
+            
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    lang_file_path = os.path.join(base_dir, 'language', f'{lang_code}.py')
+    
+    if not os.path.exists(lang_file_path):
+        print(f"⚠️ Language file {lang_code}.py not found. Using English (en).")
+        lang_code = 'en'
+        lang_file_path = os.path.join(base_dir, 'language', f'{lang_code}.py')
+        
+    spec = importlib.util.spec_from_file_location("STR", lang_file_path)
+    if spec is None:
+        print("❌ Critical error: locale file specification not found.")
+        sys.exit(1)
+        
+    strings_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(strings_module)
+    
+    return strings_module
+
+STR = load_strings()
@@ -13,6 +13,7 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQu
 from yt_dlp import YoutubeDL
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.client.default import DefaultBotProperties
+import webhook
 
 # --- Load Environment ---
 load_dotenv()
@@ -33,8 +34,8 @@ logging.basicConfig(level=logging.INFO, format='[%(asctime)s] [%(levelname)s] %(
 logger = logging.getLogger(__name__)
 
 # --- Bot Initialization ---
-# Fixed the initialization as requested
-bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
+# BOT_TOKEN may list several comma-separated tokens; handlers reply through the bot that got the update
+bots = [Bot(token=token.strip(), default=DefaultBotProperties(parse_mode="HTML")) for token in BOT_TOKEN.split(",")]
 dp = Dispatcher()
 
 user_last_request_time = {}
@@ -184,7 +185,7 @@ async def handle(message: types.Message):
         ])
         
         await status.delete()
-        sent = await bot.send_audio(
+        sent = await message.bot.send_audio(
             chat_id=message.chat.id, audio=audio, title=info.get("title"),
             performer=info.get("uploader"), thumbnail=thumbnail, reply_markup=kb,
             reply_to_message_id=message.reply_to_message.message_id if message.reply_to_message else None
@@ -196,7 +197,7 @@ async def handle(message: types.Message):
             await asyncio.sleep(60)
             try:
                 new_kb = InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text=btn_text, callback_data=f"info_{key}")]])
-                await bot.edit_message_reply_markup(chat_id=sent.chat.id, message_id=sent.message_id, reply_markup=new_kb)
+                await message.bot.edit_message_reply_markup(chat_id=sent.chat.id, message_id=sent.message_id, reply_markup=new_kb)
             except: pass
         asyncio.create_task(hide_alt_button())
         cleanup_temp_files(base)
@@ -254,4 +255,4 @@ async def show_info(cq: CallbackQuery):
 # Note: choose_song and cancel_alt omitted for brevity, should follow the same pattern.
 
 if __name__ == "__main__":
-    asyncio.run(dp.start_polling(bot))
\ No newline at end of file
+    asyncio.run(webhook.run(dp, bots))
\ No newline at end of file
@@ -1,112 +1,582 @@
 import asyncio
 import logging
 import os
+import json
+import time
+import argparse
+from types import SimpleNamespace
+from collections import Counter
 import difflib
-import random
+import hashlib
 from telethon import TelegramClient, events
-from telethon.errors import FloodWaitError 
-from telethon.tl.types import MessageMediaDocument, DocumentAttributeAudio
+from telethon.errors import FloodWaitError, FileReferenceExpiredError, RPCError
+from telethon.tl.types import MessageMediaDocument, DocumentAttributeAudio, Document
 from dotenv import load_dotenv
 
 # --- CONFIGURATION ---
 load_dotenv()
-API_ID = int(os.getenv("API_ID"))
+API_ID = os.getenv("API_ID") # Not needed for --replay
 API_HASH = os.getenv("API_HASH")
-SOURCE_CHANNEL_ID = int(os.getenv("SOURCE_CHANNEL_ID"))
-DESTINATION_CHANNEL_ID = int(os.getenv("DESTINATION_CHANNEL_ID"))
-LAST_PROCESSED_ID = 4969 # Resume from this message ID
+ROUTES_FILE = os.getenv("ROUTES_FILE", "routes.json") # Many sources -> destinations, see README
+LAST_PROCESSED_ID = 4969 # Resume from this message ID (single-route .env setup only)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Constants & Filters
+# Constants & Filters (defaults for every route)
 MIN_SIZE = 1024 * 1024 # 1 MB
 MAX_SIZE = 40 * 1024 * 1024 # 40 MB
 ALLOWED_MIMES = ['audio/mpeg', 'audio/mp3']
-SENT_TITLES = set()
 SIMILARITY_THRESHOLD = 0.90
 TITLE_BLACKLIST = {'unknown', 'track', 'audio', 'неизвестный'}
+HASH_CHUNK = 64 * 1024 # Bytes read from each end of a file for its partial content hash
+
+# Pipeline settings
+FETCH_QUEUE_SIZE = 1000 # History prefetched ahead of the filter stage
+SEND_QUEUE_SIZE = 200 # Accepted messages waiting for the sender (two batches)
+STATS_INTERVAL = 30 # Seconds between throughput reports
+SCHEDULER_TICK = 0.5 # How often the sender looks for a lane with a ready batch
 
 # Anti-Flood settings
-TRANSFER_COUNT = 0
-TRANSFER_LIMIT = 500
-LONG_PAUSE = 120 # 2 minutes pause after limit reached
-FIXED_DELAY = 1.0 # 1 second between messages
+BATCH_SIZE = 100 # Telegram accepts up to 100 ids per forward call
+BATCH_LINGER = 5.0 # Flush a partial batch after this many idle seconds
+START_DELAY = 2.0 # Initial pause between batch calls
+MIN_DELAY = 0.5 # Fastest pace the controller is allowed to reach
+MAX_DELAY = 60.0 # Slowest pace after repeated flood waits
+DELAY_STEP = 0.25 # Additive speed-up after every successful call
+BACKOFF_FACTOR = 2.0 # Multiplicative slow-down after a flood wait or error
+MAX_RETRIES = 5 # Attempts for a batch failing with non-flood errors
+
+class Route:
+    """One mapping from source channels to a destination, with its own filters."""
+
+    def __init__(self, config: dict):
+        self.sources = [int(source) for source in config["sources"]]
+        self.destination = int(config["destination"])
+        self.last_processed_id = int(config.get("last_processed_id", 0))
+        self.min_size = int(config.get("min_size", MIN_SIZE))
+        self.max_size = int(config.get("max_size", MAX_SIZE))
+        self.mimes = set(config.get("mimes", ALLOWED_MIMES))
+        self.blacklist = {word.lower() for word in config.get("blacklist", TITLE_BLACKLIST)}
+
+def load_routes() -> list:
+    if os.path.exists(ROUTES_FILE):
+        with open(ROUTES_FILE, "r", encoding="utf-8") as f:
+            return [Route(config) for config in json.load(f)]
+
+    # Fallback to the original one-pair setup from .env
+    source, destination = os.getenv("SOURCE_CHANNEL_ID"), os.getenv("DESTINATION_CHANNEL_ID")
+    if not source or not destination:
+        raise ValueError(f"❌ Error: no {ROUTES_FILE} and SOURCE_CHANNEL_ID/DESTINATION_CHANNEL_ID not set in .env")
+    return [Route({"sources": [source], "destination": destination, "last_processed_id": LAST_PROCESSED_ID})]
+
+class RateController:
+    """AIMD pacing: the delay shrinks additively on success and grows multiplicatively on flood waits."""
+
+    def __init__(self, delay=START_DELAY):
+        self.delay = delay
+        self.next_call = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            pause = self.next_call - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            self.next_call = time.monotonic() + self.delay
+
+    def on_success(self):
+        self.delay = max(MIN_DELAY, self.delay - DELAY_STEP)
+
+    def on_flood(self, seconds: int):
+        self.delay = min(MAX_DELAY, self.delay * BACKOFF_FACTOR)
+        # Nobody may call again before the server-imposed wait is over
+        self.next_call = max(self.next_call, time.monotonic() + seconds)
+
+    def on_error(self):
+        self.delay = min(MAX_DELAY, self.delay * BACKOFF_FACTOR)
+
+class Lane:
+    """Accepted messages waiting to go from one source to one destination."""
+
+    def __init__(self, source: int, destination: int):
+        self.source = source
+        self.destination = destination
+        self.queue = asyncio.Queue(SEND_QUEUE_SIZE)
+        self.first_pending = None
+
+    async def put(self, message):
+        await self.queue.put(message)
+        if self.first_pending is None:
+            self.first_pending = time.monotonic()
+
+    def ready(self, now: float) -> bool:
+        # Live messages trickle in one by one, so a partial batch goes out once it has waited BATCH_LINGER
+        if self.first_pending is None:
+            return False
+        return self.queue.qsize() >= BATCH_SIZE or now - self.first_pending >= BATCH_LINGER
+
+    def take(self) -> list:
+        batch = []
+        while len(batch) < BATCH_SIZE and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        self.first_pending = time.monotonic() if not self.queue.empty() else None
+        return batch
+
+class BatchSender:
+    """Send stage: serves all lanes round-robin under one shared RateController.
+
+    Messages that end up not forwarded are dropped from the dedupe index, so a later copy can still go out.
+    """
+
+    def __init__(self, client, controller: RateController, dedupe=None):
+        self.client = client
+        self.controller = controller
+        self.dedupe = dedupe
+        self.lanes = {}
+        self.cursor = 0
+
+    def lane(self, source: int, destination: int) -> Lane:
+        key = (source, destination)
+        if key not in self.lanes:
+            self.lanes[key] = Lane(source, destination)
+        return self.lanes[key]
+
+    def next_ready(self):
+        lanes = list(self.lanes.values())
+        now = time.monotonic()
+        for step in range(len(lanes)):
+            index = (self.cursor + step) % len(lanes)
+            if lanes[index].ready(now):
+                # The next search starts after this lane, so a busy route can't starve the others
+                self.cursor = index + 1
+                return lanes[index]
+        return None
+
+    async def run(self, stats):
+        while True:
+            lane = self.next_ready()
+            if lane is None:
+                await asyncio.sleep(SCHEDULER_TICK)
+                continue
+
+            batch = lane.take()
+            stats.add("sent", await self.send_batch(lane, batch))
+
+    async def send_batch(self, lane: Lane, batch) -> int:
+        """Forwards a batch and returns how many messages went out.
+
+        A batch Telegram rejects is split in half and each half sent on its own, until the
+        messages at fault are isolated; the rest of the batch is still delivered.
+        """
+        ids = [m.id for m in batch]
+        route_name = f"{lane.source} → {lane.destination}"
+        attempt = 0
+        while True:
+            await self.controller.wait()
+            try:
+                results = await self.client.forward_messages(
+                    lane.destination, ids, from_peer=lane.source,
+                    silent=True, drop_author=True, drop_media_captions=True
+                )
+                self.controller.on_success()
+                break
+            except FloodWaitError as e:
+                # Flood waits are not failures: the same batch goes out once the wait is over
+                self.controller.on_flood(e.seconds)
+                logging.critical(f"🚨 Flood Wait: {e.seconds}s. Retrying batch {ids[0]}..{ids[-1]} of {route_name}, delay now {self.controller.delay:.2f}s")
+            except Exception as e:
+                attempt += 1
+                self.controller.on_error()
+                # An error about the request itself won't go away by retrying; connection errors may
+                if isinstance(e, RPCError) or attempt >= MAX_RETRIES:
+                    if len(batch) == 1:
+                        logging.error(f"❌ [{route_name}] Message {ids[0]} failed after {attempt} attempt(s): {e}")
+                        self.forget(lane, batch)
+                        return 0
+                    half = len(batch) // 2
+                    logging.error(f"❌ [{route_name}] Batch {ids[0]}..{ids[-1]} failed: {e}. Splitting it to find the bad message...")
+                    return await self.send_batch(lane, batch[:half]) + await self.send_batch(lane, batch[half:])
+                logging.error(f"❌ [{route_name}] Error: {e}. Retrying batch ({attempt}/{MAX_RETRIES})...")
+
+        # Telegram leaves a gap for every message it skipped, e.g. one deleted since it was fetched
+        missing = [message for message, result in zip(batch, results) if result is None]
+        if missing:
+            logging.warning(f"⚠️ [{route_name}] Not forwarded: {', '.join(str(m.id) for m in missing)}")
+            self.forget(lane, missing)
+        sent = len(batch) - len(missing)
+        logging.info(f"✅ [{route_name}] Forwarded batch of {sent} ({ids[0]}..{ids[-1]}), next delay {self.controller.delay:.2f}s")
+        return sent
+
+    def forget(self, lane: Lane, messages):
+        if self.dedupe:
+            for message in messages:
+                self.dedupe.remove(lane.destination, message)
 
 def clean_title(title: str, performer: str) -> str:
     return f"{performer} {title}".strip().lower()
 
-def is_duplicate(current_title_clean: str) -> bool:
+def is_blacklisted(current_title_clean: str, blacklist: set) -> bool:
+    return any(word in current_title_clean for word in blacklist)
+
+def is_duplicate(current_title_clean: str, sent_titles: set) -> bool:
     if not current_title_clean:
         return False
-    
-    if any(word in current_title_clean for word in TITLE_BLACKLIST):
-        return True
 
-    for sent_title in SENT_TITLES:
+    for sent_title in sent_titles:
         if difflib.SequenceMatcher(None, current_title_clean, sent_title).ratio() >= SIMILARITY_THRESHOLD:
             return True
     return False
 
-async def transfer_message(client, message):
-    global TRANSFER_COUNT
+async def hash_document(client, doc) -> str:
+    # Only the first and last HASH_CHUNK bytes are read; both offsets stay aligned for upload.getFile
+    digest = hashlib.sha1()
+    tail_offset = (doc.size - 1) // HASH_CHUNK * HASH_CHUNK if doc.size else 0
+    for offset in sorted({0, tail_offset}):
+        async for chunk in client.iter_download(doc, offset=offset, request_size=HASH_CHUNK, limit=1, file_size=doc.size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+async def partial_hash(client, message) -> str:
+    try:
+        return await hash_document(client, message.media.document)
+    except FileReferenceExpiredError:
+        # File references expire after a while; a fresh copy of the message carries a valid one
+        fresh = await client.get_messages(message.chat_id, ids=message.id)
+        if not fresh or not isinstance(fresh.media, MessageMediaDocument):
+            raise
+        return await hash_document(client, fresh.media.document)
+
+class DedupeIndex:
+    """Exact-match index of forwarded audio by Telegram document id and by (size, duration, partial hash).
+
+    Shared by all routes; entries are scoped per destination, so the same track may
+    still go to two different channels.
+    """
+
+    def __init__(self, hasher):
+        self.hasher = hasher
+        # (destination, document id) -> (duration, cleaned title) of every accepted track
+        self.document_ids = {}
+        # (destination, size, duration) -> {document id: message}; hashes are fetched
+        # lazily, only once two files share the same size and duration
+        self.shapes = {}
+        self.hashes = {}
+        self.titles = {}
+        # Check-then-add must be atomic, otherwise two sources could both pass the same track.
+        # Hashes are fetched before taking it, so a slow download never holds up other tracks
+        self.lock = asyncio.Lock()
+
+    def sent_titles(self, destination: int) -> set:
+        return self.titles.setdefault(destination, set())
+
+    async def digest(self, message):
+        doc = message.media.document
+        if doc.id not in self.hashes:
+            try:
+                self.hashes[doc.id] = await self.hasher(message)
+            except Exception as e:
+                # Not cached: the next comparison tries again
+                logging.warning(f"⚠️ Partial hash failed for document {doc.id}: {e}")
+                return None
+        return self.hashes[doc.id]
+
+    async def prepare(self, destination: int, message, duration) -> set:
+        """Hashes the message's document and the files of the same shape; returns the ids it covered."""
+        doc = message.media.document
+        candidates = dict(self.shapes.get((destination, doc.size, duration), {}))
+        if candidates and doc.id not in candidates and await self.digest(message) is not None:
+            for known in candidates.values():
+                await self.digest(known)
+        return set(candidates)
+
+    def is_known(self, destination: int, doc, duration, checked: set):
+        """True or False, or None if files of the same shape were added since prepare() ran."""
+        if (destination, doc.id) in self.document_ids:
+            return True
+
+        candidates = self.shapes.get((destination, doc.size, duration))
+        if not candidates:
+            return False
+        if not candidates.keys() <= checked:
+            return None
+
+        current = self.hashes.get(doc.id)
+        return current is not None and any(self.hashes.get(known) == current for known in candidates)
+
+    def add(self, destination: int, message, duration, cleaned_title: str):
+        doc = message.media.document
+        self.document_ids[(destination, doc.id)] = (duration, cleaned_title)
+        # The message rather than the document, so an expired file reference can be renewed
+        self.shapes.setdefault((destination, doc.size, duration), {})[doc.id] = message
+        self.sent_titles(destination).add(cleaned_title)
+
+    def remove(self, destination: int, message):
+        """Undoes add() for a message that could not be forwarded."""
+        doc = message.media.document
+        entry = self.document_ids.pop((destination, doc.id), None)
+        if entry is None:
+            return
+        duration, cleaned_title = entry
+        self.shapes.get((destination, doc.size, duration), {}).pop(doc.id, None)
+        self.sent_titles(destination).discard(cleaned_title)
+
+# Outcomes of filter_message; everything except ACCEPTED is a reject reason
+ACCEPTED = "accepted"
+
+async def filter_message(message, route: Route, dedupe: DedupeIndex) -> str:
     if not (message.media and isinstance(message.media, MessageMediaDocument)):
-        return
+        return "not_document"
 
     doc = message.media.document
     audio_attr = next((a for a in doc.attributes if isinstance(a, DocumentAttributeAudio)), None)
 
-    if audio_attr:
-        if doc.mime_type not in ALLOWED_MIMES:
-            return
+    if not audio_attr:
+        return "not_audio"
 
-        title = getattr(audio_attr, 'title', '') or ''
-        performer = getattr(audio_attr, 'performer', 'Unknown') or ''
-        
-        if not title and not performer:
-            return
+    if doc.mime_type not in route.mimes:
+        return "mime"
 
-        if not (MIN_SIZE <= doc.size <= MAX_SIZE):
-            return
+    title = getattr(audio_attr, 'title', '') or ''
+    performer = getattr(audio_attr, 'performer', 'Unknown') or ''
+
+    if not title and not performer:
+        return "no_tags"
+
+    if not (route.min_size <= doc.size <= route.max_size):
+        return "size"
+
+    duration = getattr(audio_attr, 'duration', 0) or 0
+    cleaned = clean_title(title, performer)
+
+    while True:
+        checked = await dedupe.prepare(route.destination, message, duration)
+        async with dedupe.lock:
+            known = dedupe.is_known(route.destination, doc, duration, checked)
+            if known is None:
+                # A file of the same shape was accepted while hashing; compare with it too
+                continue
+            if known:
+                return "exact_duplicate"
+
+            if cleaned and is_blacklisted(cleaned, route.blacklist):
+                return "blacklist"
+
+            if is_duplicate(cleaned, dedupe.sent_titles(route.destination)):
+                return "similar_title"
+
+            dedupe.add(route.destination, message, duration, cleaned)
+            break
+
+    logging.info(f"➕ Queued for {route.destination}: {performer} - {title}")
+    return ACCEPTED
+
+async def transfer_message(message, route: Route, dedupe: DedupeIndex) -> bool:
+    return await filter_message(message, route, dedupe) == ACCEPTED
+
+class PipelineStats:
+    """Per-stage counters, logged periodically as throughput together with queue depths."""
+
+    def __init__(self):
+        self.counts = {"fetched": 0, "filtered": 0, "accepted": 0, "sent": 0}
+
+    def add(self, stage: str, amount: int = 1):
+        self.counts[stage] += amount
 
-        cleaned = clean_title(title, performer)
-        if is_duplicate(cleaned):
+    async def report(self, queues):
+        last_counts, last_time = dict(self.counts), time.monotonic()
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            now = time.monotonic()
+            elapsed = now - last_time
+            rates = ", ".join(f"{stage} {(count - last_counts[stage]) / elapsed:.1f}/s" for stage, count in self.counts.items())
+            # Called each time, so lanes added after startup are included
+            depths = ", ".join(f"{name} {q.qsize()}/{q.maxsize}" for name, q in queues().items())
+            logging.info(f"📊 {rates} | queues: {depths}")
+            last_counts, last_time = dict(self.counts), now
+
+class Pipeline:
+    """Fetch and filter stages of one source; history and live events share one ordered, deduplicated input queue."""
+
+    def __init__(self, client, source: int, routes: list, sender: BatchSender, dedupe: DedupeIndex, stats: PipelineStats):
+        self.client = client
+        self.source = source
+        self.routes = routes
+        self.lanes = [sender.lane(source, route.destination) for route in routes]
+        self.dedupe = dedupe
+        self.stats = stats
+        self.fetch_queue = asyncio.Queue(FETCH_QUEUE_SIZE)
+        self.last_id = 0
+        self.history_done = False
+        self.live_backlog = []
+
+    async def push(self, message):
+        # Drops anything already seen, so live events overlapping the history scan are not sent twice
+        if message.id <= self.last_id:
             return
+        self.last_id = message.id
+        self.stats.add("fetched")
+        await self.fetch_queue.put(message)
 
-        SENT_TITLES.add(cleaned)
+    async def fetch_history(self):
+        # Pages are requested while the filter and send stages are still busy with earlier ones
+        self.last_id = min(route.last_processed_id for route in self.routes)
+        async for message in self.client.iter_messages(self.source, reverse=True, min_id=self.last_id):
+            await self.push(message)
 
-        try:
-            await client.send_file(DESTINATION_CHANNEL_ID, message, caption='', silent=True)
-            logging.info(f"✅ Forwarded: {performer} - {title}")
-            TRANSFER_COUNT += 1
-        except FloodWaitError as e:
-            logging.critical(f"🚨 Flood Wait: {e.seconds}s. Sleeping...")
-            await asyncio.sleep(e.seconds)
+        while self.live_backlog:
+            backlog, self.live_backlog = sorted(self.live_backlog, key=lambda m: m.id), []
+            for message in backlog:
+                await self.push(message)
+        self.history_done = True
+        logging.info(f"📚 [{self.source}] History scan finished at message {self.last_id}, switching to live mode")
+
+    async def on_live_message(self, message):
+        if not self.history_done:
+            self.live_backlog.append(message)
             return
-        except Exception as e:
-            logging.error(f"❌ Error: {e}")
+        await self.push(message)
+
+    async def filter_worker(self):
+        while True:
+            message = await self.fetch_queue.get()
+            try:
+                self.stats.add("filtered")
+                for route, lane in zip(self.routes, self.lanes):
+                    if message.id <= route.last_processed_id:
+                        continue
+                    if await transfer_message(message, route, self.dedupe):
+                        self.stats.add("accepted")
+                        await lane.put(message)
+            except Exception as e:
+                logging.error(f"❌ [{self.source}] Filter error on message {message.id}: {e}")
+            finally:
+                self.fetch_queue.task_done()
+
+class NullSender:
+    """Replay stand-in for BatchSender: counts what would have been forwarded."""
+
+    def __init__(self):
+        self.sent = Counter()
+
+    async def send(self, route: Route, message):
+        self.sent[route.destination] += 1
+
+def message_from_dump(record: dict):
+    # Only the fields filter_message reads are rebuilt, using real Telethon types for the media
+    document = record.get("document")
+    if not document:
+        return SimpleNamespace(id=record["id"], media=None)
+
+    attributes = []
+    audio = document.get("audio")
+    if audio is not None:
+        attributes.append(DocumentAttributeAudio(
+            duration=audio.get("duration", 0), title=audio.get("title"), performer=audio.get("performer")
+        ))
+    doc = Document(
+        id=document["id"], access_hash=0, file_reference=b"", date=None,
+        mime_type=document.get("mime_type", ""), size=document.get("size", 0), dc_id=0, attributes=attributes
+    )
+    return SimpleNamespace(id=record["id"], media=MessageMediaDocument(document=doc))
 
-        await asyncio.sleep(FIXED_DELAY)
+async def replay(dump_path: str, routes: list, sender=None):
+    """Runs the live filter and dedupe logic over a JSONL export, without a Telegram connection."""
+    sender = sender or NullSender()
+    hashes = {}
 
-        if TRANSFER_COUNT >= TRANSFER_LIMIT:
-            logging.warning(f"Limit reached. Resting for {LONG_PAUSE}s...")
-            TRANSFER_COUNT = 0
-            await asyncio.sleep(LONG_PAUSE)
+    async def dump_hash(message):
+        # Files exported without a hash can only match by document id
+        doc = message.media.document
+        return hashes.get(doc.id) or f"id:{doc.id}"
+
+    dedupe = DedupeIndex(dump_hash)
+    reasons = Counter()
+    processed = 0
+    started = time.perf_counter()
+
+    with open(dump_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            document = record.get("document") or {}
+            if document.get("hash"):
+                hashes[document["id"]] = document["hash"]
+
+            message = message_from_dump(record)
+            chat_id = record.get("chat_id")
+            for route in routes:
+                if chat_id is not None and int(chat_id) not in route.sources:
+                    continue
+                if message.id <= route.last_processed_id:
+                    continue
+                reason = await filter_message(message, route, dedupe)
+                reasons[reason] += 1
+                if reason == ACCEPTED:
+                    await sender.send(route, message)
+            processed += 1
+
+    elapsed = time.perf_counter() - started
+    print(f"\n📼 Replayed {processed} messages from {dump_path} in {elapsed:.2f}s ({processed / elapsed if elapsed else 0:.0f} msg/s)")
+    for reason, count in reasons.most_common():
+        print(f"  {reason:<16} {count}")
+    if isinstance(sender, NullSender):
+        for destination, count in sender.sent.items():
+            print(f"  → {destination}: {count} would be forwarded")
+    return reasons
 
 async def main():
-    client = TelegramClient('forwarder_session', API_ID, API_HASH)
+    routes = load_routes()
+
+    client = TelegramClient('forwarder_session', int(API_ID), API_HASH)
     await client.start()
-    logging.info("Forwarder Bot Started!")
+    logging.info(f"Forwarder Bot Started! Serving {len(routes)} route(s)")
 
-    # 1. Process History
-    async for message in client.iter_messages(SOURCE_CHANNEL_ID, reverse=True, min_id=LAST_PROCESSED_ID):
-        await transfer_message(client, message)
+    stats = PipelineStats()
+    dedupe = DedupeIndex(lambda message: partial_hash(client, message))
+    sender = BatchSender(client, RateController(), dedupe)
 
-    # 2. Listen for New Messages
-    @client.on(events.NewMessage(chats=SOURCE_CHANNEL_ID, incoming=True))
+    routes_by_source = {}
+    for route in routes:
+        for source in route.sources:
+            routes_by_source.setdefault(source, []).append(route)
+    pipelines = {
+        source: Pipeline(client, source, source_routes, sender, dedupe, stats)
+        for source, source_routes in routes_by_source.items()
+    }
+
+    # Live messages are buffered until each history scan catches up, then flow through the same queues
+    @client.on(events.NewMessage(chats=list(pipelines), incoming=True))
     async def handler(event):
-        await transfer_message(client, event.message)
+        pipeline = pipelines.get(event.chat_id)
+        if pipeline:
+            await pipeline.on_live_message(event.message)
+
+    def queues():
+        depths = {f"fetch {source}": p.fetch_queue for source, p in pipelines.items()}
+        depths.update({f"send {lane.source}→{lane.destination}": lane.queue for lane in sender.lanes.values()})
+        return depths
+
+    tasks = [
+        asyncio.create_task(sender.run(stats)),
+        asyncio.create_task(stats.report(queues)),
+    ]
+    for pipeline in pipelines.values():
+        tasks.append(asyncio.create_task(pipeline.fetch_history()))
+        tasks.append(asyncio.create_task(pipeline.filter_worker()))
 
     await client.run_until_disconnected()
+    for task in tasks:
+        task.cancel()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Telegram music forwarder")
+    parser.add_argument("--replay", metavar="DUMP", help="run the filters over a JSONL message export instead of Telegram")
+    args = parser.parse_args()
+
+    if args.replay:
+        # Per-track logging would dominate the timing
+        logging.getLogger().setLevel(logging.WARNING)
+        asyncio.run(replay(args.replay, load_routes()))
+    else:
+        asyncio.run(main())
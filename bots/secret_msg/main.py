@@ -14,6 +14,7 @@ from aiogram.types import (
     InlineKeyboardMarkup, 
     CallbackQuery
 )
+import webhook
 
 load_dotenv()
 API_TOKEN = os.getenv("TELEGRAM_API_TOKEN")
@@ -144,11 +145,11 @@ async def reply_handler(message: types.Message):
     await message.answer(f"📬 @{target_user}, you received a secret message! 💌", reply_markup=kb)
 
 async def main():
-    bot = Bot(token=API_TOKEN)
+    # TELEGRAM_API_TOKEN may list several comma-separated tokens, all served by the same router
+    bots = [Bot(token=token.strip()) for token in API_TOKEN.split(",")]
     dp = Dispatcher()
     dp.include_router(router)
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    await webhook.run(dp, bots, drop_pending_updates=True)
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,101 @@
+import os
+import signal
+import asyncio
+import hashlib
+import logging
+
+from aiohttp import web
+from dotenv import load_dotenv
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+# Webhook settings
+load_dotenv()
+RUN_MODE = os.getenv("RUN_MODE", "polling") # "webhook" to receive updates over HTTP
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "") # Public https address Telegram posts to; empty to register it yourself
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook") # Each bot is served at <path>/<bot id>
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+
+# Constants
+DRAIN_TIMEOUT = 60 # Seconds shutdown waits for updates still being handled
+
+logger = logging.getLogger(__name__)
+
+def secret_for(bot: Bot):
+    # Derived from the token when not configured, so every replica expects the same one
+    return WEBHOOK_SECRET or hashlib.sha256(f"webhook:{bot.token}".encode()).hexdigest()
+
+def path_for(bot: Bot):
+    return f"{WEBHOOK_PATH}/{bot.id}"
+
+class InFlight:
+    """Counts updates being handled, so shutdown can let them finish before the bot sessions close."""
+
+    def __init__(self):
+        self.count = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        self.count += 1
+        self.idle.clear()
+        try:
+            return await handler(request)
+        finally:
+            self.count -= 1
+            if not self.count:
+                self.idle.set()
+
+    async def drain(self, app):
+        if self.count:
+            logger.info(f"Finishing {self.count} update(s) before shutdown...")
+        try:
+            await asyncio.wait_for(self.idle.wait(), DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Shutting down with {self.count} update(s) unfinished.")
+
+async def run(dispatcher: Dispatcher, bots, drop_pending_updates=False, stop=None, **kwargs):
+    """Receives updates for every bot by long polling, or through one web server when RUN_MODE=webhook."""
+    if RUN_MODE != "webhook":
+        for bot in bots:
+            # Telegram refuses getUpdates while a webhook is set
+            await bot.delete_webhook(drop_pending_updates=drop_pending_updates)
+        await dispatcher.start_polling(*bots, **kwargs)
+        return
+
+    in_flight = InFlight()
+    app = web.Application(middlewares=[in_flight.middleware])
+    # Registered first: aiohttp runs on_shutdown before it waits for open requests, and the
+    # request handlers' own on_shutdown closes the bot sessions those requests still use
+    app.on_shutdown.append(in_flight.drain)
+    for bot in bots:
+        # Answered only once handled: a crash mid-update makes Telegram deliver it again
+        handler = SimpleRequestHandler(dispatcher, bot, handle_in_background=False, secret_token=secret_for(bot), **kwargs)
+        handler.register(app, path=path_for(bot))
+    setup_application(app, dispatcher, bots=bots, **kwargs)
+
+    runner = web.AppRunner(app, handle_signals=False)
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+    try:
+        for bot in bots:
+            if WEBHOOK_URL:
+                await bot.set_webhook(
+                    WEBHOOK_URL.rstrip("/") + path_for(bot), secret_token=secret_for(bot),
+                    allowed_updates=dispatcher.resolve_used_update_types(), drop_pending_updates=drop_pending_updates
+                )
+            logger.info(f"Serving bot {bot.id} at http://{WEBHOOK_HOST}:{WEBHOOK_PORT}{path_for(bot)}")
+
+        stop = stop or asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass # Windows: Ctrl+C still interrupts, and cleanup below still runs
+        await stop.wait()
+    finally:
+        await runner.cleanup()
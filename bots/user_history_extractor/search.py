@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timezone
+
+from src.archive import Archive, MEDIA_KINDS, archive_path
+
+def parse_date(value: str) -> int:
+    return int(datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+
+def main():
+    parser = argparse.ArgumentParser(description="Search a user's extracted message archive")
+    parser.add_argument("user_id", type=int, help="archived user ID")
+    parser.add_argument("phrase", nargs="?", help="phrase to look for (omit to list by filters only)")
+    parser.add_argument("--since", type=parse_date, help="from date, YYYY-MM-DD")
+    parser.add_argument("--until", type=parse_date, help="before date, YYYY-MM-DD")
+    parser.add_argument("--media", choices=MEDIA_KINDS + ("other",), help="only messages with this media type")
+    parser.add_argument("--chat", type=int, help="only this chat ID")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    if not os.path.exists(archive_path(args.user_id)):
+        print(f"No archive for user {args.user_id}, run the extractor first.")
+        sys.exit(1)
+
+    archive = Archive(args.user_id)
+    started = time.perf_counter()
+    hits = archive.search(args.phrase, args.since, args.until, args.media, args.chat, args.limit)
+    elapsed = (time.perf_counter() - started) * 1000
+    archive.close()
+
+    for date, title, message_id, reply_to, media, text in hits:
+        time_str = datetime.fromtimestamp(date, timezone.utc).strftime("[%Y-%m-%d %H:%M:%S]")
+        reply = f" ↩{reply_to}" if reply_to else ""
+        kind = f" <{media}>" if media else ""
+        print(f"{time_str} ({title}) #{message_id}{reply}{kind} {text or ''}".rstrip())
+    print(f"\n🔎 {len(hits)} hit(s) in {elapsed:.1f} ms")
+
+if __name__ == "__main__":
+    main()
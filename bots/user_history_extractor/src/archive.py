@@ -0,0 +1,255 @@
+import os
+import sqlite3
+
+from src.config import ARCHIVE_DIR, CHUNK_SIZE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    chat_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    date INTEGER NOT NULL,
+    text TEXT,
+    edit_date INTEGER,
+    reply_to INTEGER,
+    media_type TEXT,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (chat_id, message_id)
+);
+CREATE INDEX IF NOT EXISTS messages_date ON messages (date);
+CREATE TABLE IF NOT EXISTS chats (
+    chat_id INTEGER PRIMARY KEY,
+    title TEXT,
+    synced_max_id INTEGER NOT NULL DEFAULT 0,
+    scan_top INTEGER,
+    scan_offset INTEGER
+);
+CREATE TABLE IF NOT EXISTS media (
+    chat_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    file_id INTEGER,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    ext TEXT,
+    PRIMARY KEY (chat_id, message_id)
+);
+CREATE INDEX IF NOT EXISTS media_file ON media (file_id);
+
+-- Full-text index over messages.text, kept in sync by triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    text, content='messages', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE OF text ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO messages_fts (rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+# Archives created before the structured columns existed keep their rows
+MIGRATE_V1 = """
+DROP INDEX IF EXISTS messages_date;
+ALTER TABLE messages RENAME TO messages_v1;
+"""
+MIGRATE_V1_COPY = """
+INSERT INTO messages (chat_id, message_id, date, text, edit_date, deleted)
+    SELECT chat_id, message_id, date, text, edit_date, deleted FROM messages_v1;
+DROP TABLE messages_v1;
+INSERT INTO messages_fts (messages_fts) VALUES ('rebuild');
+"""
+
+UPSERT = """
+INSERT INTO messages (chat_id, message_id, date, text, edit_date, reply_to, media_type)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (chat_id, message_id) DO UPDATE SET
+    date = excluded.date, text = excluded.text, edit_date = excluded.edit_date,
+    reply_to = excluded.reply_to, media_type = excluded.media_type, deleted = 0
+"""
+
+# Checked in order: a voice note is also a document, a GIF is also a video
+MEDIA_KINDS = ("voice", "video_note", "gif", "sticker", "video", "audio", "photo", "document", "poll", "geo", "contact", "web_preview")
+
+def media_type(message):
+    if not message.media:
+        return None
+    return next((kind for kind in MEDIA_KINDS if getattr(message, kind, None)), "other")
+
+def timestamp(date) -> int:
+    return int(date.timestamp()) if date else 0
+
+def archive_path(user_id: int) -> str:
+    return os.path.join(ARCHIVE_DIR, f"user_{user_id}.db")
+
+class Archive:
+    """Local SQLite archive of one user's messages, keyed by (chat id, message id)."""
+
+    def __init__(self, user_id: int):
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        self.path = archive_path(user_id)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # Every chunk is its own transaction; NORMAL skips the fsync per commit that WAL doesn't need
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(messages)")]
+        if columns and "reply_to" not in columns:
+            self.conn.executescript(MIGRATE_V1 + SCHEMA + MIGRATE_V1_COPY)
+        self.conn.executescript(SCHEMA)
+
+    def chat(self, chat_id: int, title: str) -> "ChatSync":
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO chats (chat_id, title) VALUES (?, ?) ON CONFLICT(chat_id) DO UPDATE SET title = excluded.title",
+                (chat_id, title)
+            )
+        return ChatSync(self, chat_id)
+
+    def count(self, chat_ids: list) -> int:
+        marks = ",".join("?" * len(chat_ids))
+        return self.conn.execute(f"SELECT COUNT(*) FROM messages WHERE chat_id IN ({marks})", chat_ids).fetchone()[0]
+
+    def rows(self, chat_ids: list):
+        """Streams (date, chat title, text, media type, deleted) newest first; the date index does the ordering."""
+        marks = ",".join("?" * len(chat_ids))
+        return self.conn.execute(
+            f"SELECT m.date, c.title, m.text, m.media_type, m.deleted FROM messages m JOIN chats c USING (chat_id) "
+            f"WHERE m.chat_id IN ({marks}) ORDER BY m.date DESC, m.message_id DESC",
+            chat_ids
+        )
+
+    def has_media(self, chat_id: int, message_id: int) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM media WHERE chat_id = ? AND message_id = ?", (chat_id, message_id)
+        ).fetchone() is not None
+
+    def missing_media(self, chat_id: int, kinds) -> list:
+        """Ids of archived messages with an attachment of one of `kinds` that was never stored."""
+        kinds = sorted(kinds)
+        marks = ",".join("?" * len(kinds))
+        return [row[0] for row in self.conn.execute(
+            f"SELECT m.message_id FROM messages m LEFT JOIN media d USING (chat_id, message_id) "
+            f"WHERE m.chat_id = ? AND m.deleted = 0 AND m.media_type IN ({marks}) AND d.message_id IS NULL "
+            f"ORDER BY m.message_id",
+            [chat_id] + kinds
+        )]
+
+    def find_file(self, file_id: int):
+        """(sha256, size, ext) of an already stored Telegram file, or None."""
+        return self.conn.execute("SELECT sha256, size, ext FROM media WHERE file_id = ? LIMIT 1", (file_id,)).fetchone()
+
+    def add_media(self, chat_id: int, message_id: int, file_id: int, sha256: str, size: int, ext: str):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO media (chat_id, message_id, file_id, sha256, size, ext) VALUES (?, ?, ?, ?, ?, ?)",
+                (chat_id, message_id, file_id, sha256, size, ext)
+            )
+
+    def media_bytes(self) -> int:
+        # Every distinct file is stored once, however many messages point at it
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT sha256, size FROM media)").fetchone()[0]
+
+    def search(self, phrase: str = None, since: int = None, until: int = None,
+               media: str = None, chat_id: int = None, limit: int = 50) -> list:
+        """Phrase hits ranked by bm25, or the newest matches of the filters alone."""
+        where, params = ["m.deleted = 0"], []
+        if since is not None:
+            where.append("m.date >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("m.date < ?")
+            params.append(until)
+        if media:
+            where.append("m.media_type = ?")
+            params.append(media)
+        if chat_id is not None:
+            where.append("m.chat_id = ?")
+            params.append(chat_id)
+
+        columns = "m.date, c.title, m.message_id, m.reply_to, m.media_type"
+        if phrase:
+            # Quoted, so user input is matched as a phrase rather than parsed as FTS5 syntax
+            query = '"' + phrase.replace('"', '""') + '"'
+            sql = (f"SELECT {columns}, snippet(messages_fts, 0, '[', ']', '…', 16) FROM messages_fts f "
+                   f"JOIN messages m ON m.id = f.rowid JOIN chats c USING (chat_id) "
+                   f"WHERE messages_fts MATCH ? AND {' AND '.join(where)} ORDER BY bm25(messages_fts) LIMIT ?")
+            params = [query] + params
+        else:
+            sql = (f"SELECT {columns}, m.text FROM messages m JOIN chats c USING (chat_id) "
+                   f"WHERE {' AND '.join(where)} ORDER BY m.date DESC LIMIT ?")
+        return self.conn.execute(sql, params + [limit]).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+class ChatSync:
+    """Incremental sync state of one chat.
+
+    Everything up to synced_max_id is archived. A running scan goes newest-first from
+    scan_top down to synced_max_id and checkpoints the lowest id it reached in
+    scan_offset, committed together with each chunk of rows, so an interrupted scan
+    resumes exactly where it stopped.
+    """
+
+    def __init__(self, archive: Archive, chat_id: int):
+        self.conn = archive.conn
+        self.chat_id = chat_id
+        self.synced_max_id, self.scan_top, self.scan_offset = self.conn.execute(
+            "SELECT synced_max_id, scan_top, scan_offset FROM chats WHERE chat_id = ?", (chat_id,)
+        ).fetchone()
+        self.count = 0
+        self.buffer = []
+
+    @property
+    def resumed(self) -> bool:
+        return self.scan_offset is not None
+
+    def add(self, message):
+        if self.scan_top is None:
+            self.scan_top = message.id
+        self.buffer.append((
+            self.chat_id, message.id, timestamp(message.date), message.text, timestamp(message.edit_date) or None,
+            message.reply_to.reply_to_msg_id if message.reply_to else None, media_type(message)
+        ))
+        self.scan_offset = message.id
+        self.count += 1
+        if len(self.buffer) >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self, done: bool = False):
+        with self.conn:
+            self.conn.executemany(UPSERT, self.buffer)
+            if done:
+                if self.scan_top is not None:
+                    self.synced_max_id = max(self.synced_max_id, self.scan_top)
+                self.scan_top = self.scan_offset = None
+            self.conn.execute(
+                "UPDATE chats SET synced_max_id = ?, scan_top = ?, scan_offset = ? WHERE chat_id = ?",
+                (self.synced_max_id, self.scan_top, self.scan_offset, self.chat_id)
+            )
+        self.buffer.clear()
+
+    def reconcile(self, messages: list, since: int) -> tuple:
+        """Applies edits and marks deletions among archived messages dated at or after `since`."""
+        current = {m.id: m for m in messages}
+        archived = self.conn.execute(
+            "SELECT message_id, text, edit_date FROM messages "
+            "WHERE chat_id = ? AND date >= ? AND message_id <= ? AND deleted = 0",
+            (self.chat_id, since, self.synced_max_id)
+        ).fetchall()
+
+        edited, deleted = [], []
+        for message_id, text, edit_date in archived:
+            message = current.get(message_id)
+            if message is None:
+                deleted.append((self.chat_id, message_id))
+            elif message.text != text or (timestamp(message.edit_date) or None) != edit_date:
+                edited.append((message.text, timestamp(message.edit_date) or None, self.chat_id, message_id))
+
+        with self.conn:
+            self.conn.executemany("UPDATE messages SET text = ?, edit_date = ? WHERE chat_id = ? AND message_id = ?", edited)
+            self.conn.executemany("UPDATE messages SET deleted = 1 WHERE chat_id = ? AND message_id = ?", deleted)
+        return len(edited), len(deleted)
@@ -0,0 +1,7 @@
+from telethon import TelegramClient
+from src.config import API_ID, API_HASH, SESSION_NAME
+
+def get_client():
+    # Short flood waits are slept through by Telethon on every call; longer ones are raised,
+    # and the extractor's FloodGate pauses all chats at once for them
+    return TelegramClient(SESSION_NAME, int(API_ID), API_HASH)
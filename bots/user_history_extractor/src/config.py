@@ -0,0 +1,36 @@
+import os
+import sys
+from dotenv import load_dotenv
+
+load_dotenv()
+# Checked by require_api() where a client is made; search.py works offline without them
+API_ID = os.getenv("API_ID", "")
+API_HASH = os.getenv("API_HASH")
+# Comma separated chat ids, or "all" for every dialog the user is a member of; --chats overrides it
+CHAT_IDS = os.getenv("CHAT_IDS") or os.getenv("CHANNEL_ID") or ""
+
+def require_api():
+    if not API_ID.isdigit() or not API_HASH:
+        print("Error: Check API_ID and API_HASH in .env file")
+        sys.exit(1)
+
+# Universal session name for easy migration
+SESSION_NAME = 'shared_account'
+
+MAX_PARALLEL_CHATS = int(os.getenv("MAX_PARALLEL_CHATS", 4)) # In-flight iter_messages per run
+PROGRESS_EVERY = 200 # Log progress every N messages per chat
+
+ARCHIVE_DIR = "archive" # Per-user SQLite archives, reused by later runs
+CHUNK_SIZE = 500 # Messages buffered per chat before they are committed to the archive
+RECONCILE_DAYS = int(os.getenv("RECONCILE_DAYS", 0)) # Re-check edits/deletions this far back (0 = off)
+
+# Media stage
+DOWNLOAD_MEDIA = os.getenv("DOWNLOAD_MEDIA", "0") == "1" # Default for the "Download media" checkbox
+MEDIA_DIR = "media" # Content-addressed store: media/<sha256[:2]>/<sha256>.<ext>
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", 3)) # Files downloaded at the same time
+MEDIA_BUDGET_MB = int(os.getenv("MEDIA_BUDGET_MB", 0)) # Total size of the store (0 = unlimited)
+PARALLEL_THRESHOLD = 16 * 1024 * 1024 # Files from this size are fetched in parallel parts
+PART_SIZE = 4 * 1024 * 1024 # Bytes per part; a multiple of REQUEST_SIZE
+REQUEST_SIZE = 512 * 1024 # Largest chunk upload.getFile returns
+PARTS_PER_FILE = 4 # Parts of one file in flight at the same time
+REFETCH_BATCH = 100 # Archived messages re-fetched per request to queue their missing attachments
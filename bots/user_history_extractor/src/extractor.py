@@ -0,0 +1,177 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from telethon import TelegramClient
+from telethon.errors import FloodWaitError, UserNotParticipantError, RPCError
+from telethon.tl.types import InputPeerUser
+
+from src.config import MAX_PARALLEL_CHATS, PROGRESS_EVERY, RECONCILE_DAYS, DOWNLOAD_MEDIA
+from src.archive import Archive, ChatSync
+from src.media import MediaStage
+
+class FloodGate:
+    """Bounds in-flight history iterators and pauses all of them while any one is flood-waited."""
+
+    def __init__(self, limit: int = MAX_PARALLEL_CHATS):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.resume_at = 0.0
+
+    async def wait(self):
+        pause = self.resume_at - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+    def flood(self, seconds: int):
+        self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+async def resolve_user(client: TelegramClient, user_input: str):
+    # Get user entity by ID or Username
+    if user_input.isdigit():
+        return await client.get_entity(int(user_input))
+    return await client.get_entity(user_input.lstrip('@'))
+
+async def is_member(client: TelegramClient, chat, user, gate: FloodGate) -> bool:
+    async with gate.semaphore:
+        while True:
+            await gate.wait()
+            try:
+                await client.get_permissions(chat, user)
+                return True
+            except FloodWaitError as e:
+                # Checked again once the wait is over; skipping it would silently drop the chat
+                gate.flood(e.seconds)
+            except UserNotParticipantError:
+                return False
+            except RPCError:
+                # Private, banned or admin-only chats: membership cannot be confirmed, so nothing to scan
+                return False
+
+async def resolve_chats(client: TelegramClient, chat_spec: str, user, gate: FloodGate) -> list:
+    if chat_spec.strip().lower() != "all":
+        ids = [int(part) for part in chat_spec.replace(" ", "").split(",") if part]
+        return [await client.get_entity(chat_id) for chat_id in ids]
+
+    dialogs = [d.entity async for d in client.iter_dialogs() if d.is_group or d.is_channel]
+    checks = await asyncio.gather(*(is_member(client, chat, user, gate) for chat in dialogs))
+    return [chat for chat, member in zip(dialogs, checks) if member]
+
+def chat_title(chat) -> str:
+    return getattr(chat, 'title', None) or str(chat.id)
+
+def format_line(date: int, label: str, text: str, media: str, deleted: bool) -> str:
+    time_str = datetime.fromtimestamp(date, timezone.utc).strftime("[%Y-%m-%d %H:%M:%S]") if date else "[unknown]"
+    mark = "(deleted) " if deleted else ""
+    body = text or f"<{media or 'media/empty'}>"
+    return f"{time_str} {label}{mark}{body}".strip()
+
+async def iterate(client: TelegramClient, chat, gate: FloodGate, log, **kwargs):
+    """iter_messages that sits out flood waits together with every other chat, then resumes below the last id seen."""
+    title = chat_title(chat)
+    offset_id = kwargs.pop("offset_id", 0) or 0
+    while True:
+        await gate.wait()
+        try:
+            async for message in client.iter_messages(chat, offset_id=offset_id, **kwargs):
+                # Cheap when no flood is active; otherwise holds the next page fetch
+                await gate.wait()
+                offset_id = message.id
+                yield message
+            return
+        except FloodWaitError as e:
+            log(f"⏸ [{title}] Flood wait {e.seconds}s, pausing all chats...")
+            gate.flood(e.seconds)
+
+async def reconcile_chat(client: TelegramClient, chat, peer, gate: FloodGate, sync: ChatSync, log):
+    cutoff = datetime.now(timezone.utc) - timedelta(days=RECONCILE_DAYS)
+    recent = []
+    # max_id is exclusive: only re-check what earlier runs already archived
+    async for message in iterate(client, chat, gate, log, from_user=peer, max_id=sync.synced_max_id + 1):
+        if message.date and message.date < cutoff:
+            break
+        recent.append(message)
+
+    edited, deleted = sync.reconcile(recent, int(cutoff.timestamp()))
+    if edited or deleted:
+        log(f"✏ [{chat_title(chat)}] Last {RECONCILE_DAYS} day(s): {edited} edited, {deleted} deleted")
+
+async def scan_chat(client: TelegramClient, chat, peer, gate: FloodGate, sync: ChatSync, log, media: MediaStage = None) -> int:
+    """Archives one user's messages in one chat that are newer than the last sync, newest first."""
+    title = chat_title(chat)
+
+    async with gate.semaphore:
+        if sync.resumed:
+            log(f"↪ [{title}] Resuming below message {sync.scan_offset}...")
+        elif sync.synced_max_id:
+            log(f"🔄 [{title}] Fetching messages newer than {sync.synced_max_id}...")
+        else:
+            log(f"🔎 [{title}] Scanning full history...")
+
+        if media:
+            # Attachments of messages archived by an interrupted run, or by a run without --media
+            queued = await media.backfill(chat)
+            if queued:
+                log(f"🖼 [{title}] {queued} attachment(s) from earlier runs queued for download")
+
+        try:
+            async for message in iterate(client, chat, gate, log, from_user=peer,
+                                         min_id=sync.synced_max_id, offset_id=sync.scan_offset):
+                sync.add(message)
+                if media:
+                    media.submit(chat.id, message)
+                if sync.count % PROGRESS_EVERY == 0:
+                    log(f"⏳ [{title}] {sync.count} new messages found...")
+        except BaseException:
+            # Whatever was fetched is kept, together with the checkpoint to resume from
+            sync.flush()
+            raise
+        sync.flush(done=True)
+
+        if RECONCILE_DAYS and sync.synced_max_id:
+            await reconcile_chat(client, chat, peer, gate, sync, log)
+
+    log(f"✔ [{title}] Done: {sync.count} new messages")
+    return sync.count
+
+async def extract_history(client: TelegramClient, user_input: str, chat_spec: str, log, download_media: bool = DOWNLOAD_MEDIA):
+    user = await resolve_user(client, user_input)
+    peer = InputPeerUser(user.id, user.access_hash)
+    log(f"📥 Found user: {user.first_name or 'No Name'} (ID: {user.id})")
+
+    gate = FloodGate()
+    chats = await resolve_chats(client, chat_spec, user, gate)
+    log(f"🔎 Searching messages in {len(chats)} chat(s), {MAX_PARALLEL_CHATS} at a time...")
+
+    archive = Archive(user.id)
+    media = MediaStage(client, archive, gate, log) if download_media else None
+    try:
+        if media:
+            media.start()
+        syncs = [archive.chat(chat.id, chat_title(chat)) for chat in chats]
+        results = await asyncio.gather(*(
+            scan_chat(client, chat, peer, gate, sync, log, media) for chat, sync in zip(chats, syncs)
+        ), return_exceptions=True)
+        if media:
+            await media.finish()
+
+        failed = [r for r in results if isinstance(r, BaseException)]
+        if failed:
+            # Checkpoints stay in the archive, the next run picks up where this one stopped
+            raise failed[0]
+
+        chat_ids = [chat.id for chat in chats]
+        total = archive.count(chat_ids)
+        log(f"🗄 {sum(results)} new, {total} archived in {archive.path}")
+        if not total:
+            return user, 0, ""
+
+        # Newest first straight from the archive's date index; nothing is held in memory
+        multi = len(chats) > 1
+        filename = f"history_user_{user.id}.txt"
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(f"Chat History for User ID: {user.id}\n{'='*30}\n\n")
+            for date, title, text, kind, deleted in archive.rows(chat_ids):
+                f.write(format_line(date, f"({title}) " if multi else "", text, kind, deleted) + "\n\n")
+    finally:
+        archive.close()
+
+    return user, total, filename
@@ -0,0 +1,97 @@
+import sys
+import asyncio
+from PySide6.QtWidgets import (
+    QApplication, QWidget, QVBoxLayout, QLineEdit, QPushButton, QTextEdit, QMessageBox, QCheckBox
+)
+from qasync import QEventLoop, asyncSlot
+
+from src.config import CHAT_IDS, DOWNLOAD_MEDIA
+from src.client import get_client
+from src.extractor import extract_history
+
+class MainWindow(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("TG History Extractor")
+        self.resize(500, 400)
+        # Connected on the first search and reused by every later one
+        self.client = None
+
+        layout = QVBoxLayout(self)
+
+        self.input = QLineEdit()
+        self.input.setPlaceholderText("Enter User ID or @username")
+        layout.addWidget(self.input)
+
+        self.chats_input = QLineEdit(CHAT_IDS)
+        self.chats_input.setPlaceholderText("Chat IDs (comma separated) or 'all'")
+        layout.addWidget(self.chats_input)
+
+        self.media_checkbox = QCheckBox("Download media")
+        self.media_checkbox.setChecked(DOWNLOAD_MEDIA)
+        layout.addWidget(self.media_checkbox)
+
+        self.button = QPushButton("Extract History")
+        layout.addWidget(self.button)
+
+        self.log_display = QTextEdit()
+        self.log_display.setReadOnly(True)
+        layout.addWidget(self.log_display)
+
+        self.button.clicked.connect(self.start_search)
+
+    async def get_client(self):
+        if self.client is None:
+            self.client = get_client()
+        if not self.client.is_connected():
+            self.log_display.append("🔌 Connecting...")
+            await self.client.start()
+        return self.client
+
+    @asyncSlot()
+    async def start_search(self):
+        user_input = self.input.text().strip()
+        chat_spec = self.chats_input.text().strip()
+        if not user_input or not chat_spec:
+            QMessageBox.warning(self, "Error", "Please enter a User ID or Username and the chats to search")
+            return
+
+        self.log_display.clear()
+        self.log_display.append("🚀 Initializing...")
+        self.button.setEnabled(False)
+
+        try:
+            client = await self.get_client()
+            _, count, filename = await extract_history(
+                client, user_input, chat_spec, self.log_display.append, self.media_checkbox.isChecked()
+            )
+        except Exception as e:
+            self.on_error(f"Connection Error: {e}")
+            return
+
+        self.on_done(count, filename)
+
+    def on_error(self, message):
+        self.log_display.append(f"❌ {message}")
+        self.button.setEnabled(True)
+
+    def on_done(self, count, filename):
+        if count == 0:
+            self.log_display.append("⚠ No messages found for this user in these chats.")
+        else:
+            self.log_display.append(f"✅ Success! Found {count} messages.")
+            self.log_display.append(f"📁 Saved to: {filename}")
+        self.button.setEnabled(True)
+
+def run():
+    app = QApplication(sys.argv)
+    # Telethon runs on the Qt event loop itself, no worker thread or per-search loop
+    loop = QEventLoop(app)
+    asyncio.set_event_loop(loop)
+    window = MainWindow()
+    window.show()
+    with loop:
+        loop.run_forever()
+        # Once the window is gone the loop no longer runs, so the session is closed here
+        if window.client is not None:
+            loop.run_until_complete(window.client.disconnect())
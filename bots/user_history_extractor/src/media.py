@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import os
+from telethon import TelegramClient
+from telethon.errors import FloodWaitError
+
+from src.config import (
+    MEDIA_DIR, MEDIA_WORKERS, MEDIA_BUDGET_MB, PARALLEL_THRESHOLD, PART_SIZE, REQUEST_SIZE, PARTS_PER_FILE,
+    REFETCH_BATCH
+)
+from src.archive import Archive, media_type
+
+# Kinds worth archiving; link previews, polls, locations and contacts have no file
+DOWNLOAD_KINDS = {"photo", "voice", "video_note", "gif", "sticker", "video", "audio", "document"}
+
+def store_path(sha256: str, ext: str) -> str:
+    return os.path.join(MEDIA_DIR, sha256[:2], f"{sha256}{ext or ''}")
+
+def file_id(message):
+    media = message.document or message.photo
+    return media.id if media else None
+
+def sha256_of(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+async def download_parallel(client: TelegramClient, document, path: str, size: int):
+    """Fetches PART_SIZE ranges of one file concurrently and writes each at its own offset."""
+    limiter = asyncio.Semaphore(PARTS_PER_FILE)
+
+    with open(path, "wb") as f:
+        async def part(start: int):
+            async with limiter:
+                position = start
+                requests = -(-min(PART_SIZE, size - start) // REQUEST_SIZE)
+                async for chunk in client.iter_download(document, offset=start, request_size=REQUEST_SIZE,
+                                                        limit=requests, file_size=size):
+                    # No await between seek and write, so parts can't interleave within a chunk
+                    f.seek(position)
+                    f.write(chunk)
+                    position += len(chunk)
+
+        tasks = [asyncio.create_task(part(start)) for start in range(0, size, PART_SIZE)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Stop the other parts before the file closes; the caller may already be reopening it to retry
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+class MediaStage:
+    """Background worker pool that downloads attachments of extracted messages into a content-addressed store.
+
+    The text scan only enqueues messages, so it never waits on downloads. Files already
+    stored (same message, or same Telegram file seen in another message) are skipped, and
+    nothing new is fetched once the store reaches MEDIA_BUDGET_MB. Archived messages whose
+    attachment an earlier run never stored are queued again by backfill().
+    """
+
+    def __init__(self, client: TelegramClient, archive: Archive, gate, log):
+        self.client = client
+        self.archive = archive
+        self.gate = gate
+        self.log = log
+        self.queue = asyncio.Queue()
+        self.workers = []
+        self.used = archive.media_bytes()
+        self.budget = MEDIA_BUDGET_MB * 1024 * 1024
+        self.saved = self.reused = self.skipped = self.failed = 0
+        os.makedirs(os.path.join(MEDIA_DIR, "tmp"), exist_ok=True)
+
+    def start(self):
+        self.workers = [asyncio.create_task(self.worker()) for _ in range(MEDIA_WORKERS)]
+
+    def submit(self, chat_id: int, message):
+        if media_type(message) in DOWNLOAD_KINDS and not self.archive.has_media(chat_id, message.id):
+            self.queue.put_nowait((chat_id, message))
+
+    async def backfill(self, chat) -> int:
+        """Re-fetches archived messages of a chat that still lack their attachment and queues them."""
+        ids = self.archive.missing_media(chat.id, DOWNLOAD_KINDS)
+        queued = 0
+        for start in range(0, len(ids), REFETCH_BATCH):
+            batch = ids[start:start + REFETCH_BATCH]
+            while True:
+                await self.gate.wait()
+                try:
+                    messages = await self.client.get_messages(chat, ids=batch)
+                    break
+                except FloodWaitError as e:
+                    self.gate.flood(e.seconds)
+            # None for messages deleted since they were archived
+            for message in filter(None, messages):
+                self.submit(chat.id, message)
+                queued += 1
+        return queued
+
+    async def finish(self):
+        if self.queue.qsize():
+            self.log(f"🖼 Text done, {self.queue.qsize()} attachment(s) still downloading...")
+        await self.queue.join()
+        for worker in self.workers:
+            worker.cancel()
+        self.log(f"🖼 Media: {self.saved} saved, {self.reused} already stored, {self.skipped} over budget, "
+                 f"{self.failed} failed ({self.used / 1024 / 1024:.1f} MB in {MEDIA_DIR}/)")
+
+    async def worker(self):
+        while True:
+            chat_id, message = await self.queue.get()
+            try:
+                await self.fetch(chat_id, message)
+            except Exception as e:
+                self.failed += 1
+                self.log(f"⚠ Media of message {message.id} failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def fetch(self, chat_id: int, message):
+        telegram_id = file_id(message)
+        ext = message.file.ext if message.file else ""
+
+        known = self.archive.find_file(telegram_id) if telegram_id else None
+        if known and os.path.exists(store_path(known[0], known[2])):
+            self.archive.add_media(chat_id, message.id, telegram_id, *known)
+            self.reused += 1
+            return
+
+        size = (message.file.size if message.file else 0) or 0
+        if self.budget and self.used + size > self.budget:
+            self.skipped += 1
+            return
+        # Reserved before downloading, so workers fetching at the same time can't overshoot the budget together
+        reserved = size
+        self.used += reserved
+
+        tmp_path = os.path.join(MEDIA_DIR, "tmp", f"{chat_id}_{message.id}{ext}")
+        try:
+            while True:
+                await self.gate.wait()
+                try:
+                    if message.document and size >= PARALLEL_THRESHOLD:
+                        await download_parallel(self.client, message.document, tmp_path, size)
+                    else:
+                        tmp_path = await self.client.download_media(message, file=tmp_path)
+                    break
+                except FloodWaitError as e:
+                    self.gate.flood(e.seconds)
+            if not tmp_path or not os.path.exists(tmp_path):
+                raise ValueError("nothing was downloaded")
+            sha256 = await asyncio.to_thread(sha256_of, tmp_path)
+        except BaseException:
+            self.used -= reserved
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        size = os.path.getsize(tmp_path)
+        final_path = store_path(sha256, ext)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+            self.used -= reserved
+            self.reused += 1
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(tmp_path, final_path)
+            self.used += size - reserved
+            self.saved += 1
+        self.archive.add_media(chat_id, message.id, telegram_id, sha256, size, ext)